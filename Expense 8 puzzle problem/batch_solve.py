@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import multiprocessing
+
+from boards import read_grid
+from expense_8_puzzle import Puzzle, METHODS, is_solvable
+from heuristics import heuristic_argument
+
+def parse_jobs(stream, defaults):
+    # One instance per line: either a JSON object such as
+    #   {"id": "a", "start": [2, 3, 6, 1, 0, 7, 4, 8, 5], "method": "ucs", "time_limit": 5}
+    # or just the start board as whitespace separated numbers. A line that cannot be read
+    # gives an error result in place of a job, so the other lines still run.
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            if line.startswith("{"):
+                job = json.loads(line)
+            else:
+                job = {"start": [int(x) for x in line.split()]}
+            if isinstance(job.get("start"), str):
+                job["start"] = [int(x) for x in job["start"].split()]
+            if isinstance(job.get("goal"), str):
+                job["goal"] = [int(x) for x in job["goal"].split()]
+        except ValueError as e:
+            yield {"id": number, "status": "error", "error": f"bad job line: {e}"}
+            continue
+        job.setdefault("id", number)
+        for key, value in defaults.items():
+            if job.get(key) is None:
+                job[key] = value
+        job["method"] = str(job["method"]).upper()
+        yield job
+
+def rejected(job):
+    # Parity pre-check, so unsolvable jobs never reach a worker
+    start, goal = job.get("start"), job.get("goal")
+    if not start or not goal or sorted(start) != sorted(goal):
+        return None
+    board = int(round(len(goal) ** 0.5))
+    if board * board != len(goal) or sorted(goal) != list(range(len(goal))):
+        return None
+    if is_solvable(start, goal, board):
+        return None
+    return {"id": job["id"], "method": job["method"], "status": "unsolvable", "cost": None, "depth": None, "moves": []}
+
+def solve_job(job):
+    result = {"id": job["id"]}
+    try:
+        if job["method"] not in METHODS:
+            raise ValueError(f"unknown method {job['method']}")
+        if job.get("goal") is None:
+            raise ValueError("no goal board given")
+        if job["method"] == "HDA*" and multiprocessing.current_process().daemon:
+            # multiprocessing.Pool workers are daemonic and may not start the HDA* workers
+            raise ValueError("hda* cannot run inside a batch worker; solve it on its own or through solver_service.py")
+        puzzle = Puzzle("start", "goal", job["method"], False, job["heuristic"], job["pdb_dir"], job["oracle_dir"],
+                        start_grid=job["start"], goal_grid=job["goal"],
+                        node_limit=job["node_limit"], time_limit=job["time_limit"], weight=job["weight"])
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            puzzle.solve()
+        result.update(puzzle.summary())
+    except (ValueError, KeyError, TypeError) as e:
+        result.update({"method": job.get("method"), "status": "error", "error": str(e)})
+    except Exception as e:
+        # Any other failure only spoils this job, not the whole batch
+        result.update({"method": job.get("method"), "status": "error", "error": f"{type(e).__name__}: {e}"})
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve many puzzles in parallel and write one JSON result per line.")
+    parser.add_argument("jobs", help="file with one instance per line, or - for stdin")
+    parser.add_argument("--output", default="-", help="JSONL output file (default stdout)")
+    parser.add_argument("--goal-file", default=None, help="goal used by jobs that do not give their own")
+    parser.add_argument("--method", default="A*", help="method used by jobs that do not give their own")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--chunksize", type=int, default=4, help="jobs handed to a worker at a time")
+    parser.add_argument("--node-limit", type=int, default=None, help="default per-job limit on expanded nodes")
+    parser.add_argument("--time-limit", type=float, default=None, help="default per-job limit in seconds")
+    parser.add_argument("--heuristic", type=heuristic_argument, default="manhattan")
+    parser.add_argument("--weight", type=float, default=2.0, help="default heuristic weight of wa* and awa* jobs")
+    parser.add_argument("--pdb-dir", default=".")
+    parser.add_argument("--oracle-dir", default=".")
+    args = parser.parse_args()
+
+    defaults = {
+        "goal": read_grid(args.goal_file) if args.goal_file else None,
+        "method": args.method,
+        "node_limit": args.node_limit,
+        "time_limit": args.time_limit,
+        "heuristic": args.heuristic,
+        "weight": args.weight,
+        "pdb_dir": args.pdb_dir,
+        "oracle_dir": args.oracle_dir,
+    }
+    source = sys.stdin if args.jobs == "-" else open(args.jobs, "r")
+    with source:
+        jobs = list(parse_jobs(source, defaults))
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    started = time.perf_counter()
+    counts = {}
+
+    def emit(result):
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+
+    runnable = []
+    for job in jobs:
+        result = job if job.get("status") == "error" else rejected(job)
+        if result:
+            emit(result)
+        else:
+            runnable.append(job)
+    with multiprocessing.Pool(args.workers) as pool:
+        for result in pool.imap_unordered(solve_job, runnable, args.chunksize):
+            emit(result)
+    if out is not sys.stdout:
+        out.close()
+    elapsed = time.perf_counter() - started
+    print(f"{len(jobs)} jobs in {elapsed:.2f}s with {args.workers} workers: {counts}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
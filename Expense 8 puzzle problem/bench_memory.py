@@ -0,0 +1,81 @@
+import sys
+import random
+import tracemalloc
+
+from expense_8_puzzle import Node, Puzzle
+
+def random_boards(count, seed = 0):
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(count):
+        board = list(range(9))
+        rng.shuffle(board)
+        boards.append(board)
+    return boards
+
+def measure(build, boards, *args):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = build(boards, *args)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    used = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del kept
+    return used / len(boards)
+
+def build_dict_nodes(boards):
+    # Old layout: an 11-key dict per fringe node holding its own board
+    # list, plus an 8-key copy of it in closed_steps once the node is expanded
+    fringe, closed = [], []
+    parent = None
+    for board in boards:
+        node = {'node': list(board), 'ind': board.index(0), 'val': board[0], 'parent': 0, 'move': 'Left', 'depth': 12, 'cost': 63, 'heugreedy': 40, 'heuastar': 103, 'prev': None, 'pred': parent, 'algo': 103}
+        fringe.append(node)
+        closed.append({'node': node['node'], 'ind': node['ind'], 'val': node['val'], 'parent': node['parent'], 'move': node['move'], 'depth': node['depth'], 'cost': node['cost'], 'algo': node['algo']})
+        parent = node
+    return fringe, closed
+
+def build_slot_nodes(boards, puzzle):
+    # Current layout: a __slots__ Node with the board packed into one int, and only that
+    # int kept in the closed set
+    fringe, closed = [], set()
+    parent = None
+    for board in boards:
+        key = puzzle.encode(board)
+        node = Node(key, board.index(0), board[0], 'Left', 12, 63, 40, 103, parent)
+        fringe.append(node)
+        closed.add(key)
+        parent = node
+    return fringe, closed
+
+def measure_full_search(start_file, goal_file, method):
+    puzzle = Puzzle(start_file, goal_file, method, False)
+    tracemalloc.start()
+    {'BFS': puzzle.solve_bfs, 'UCS': puzzle.solve_ucs, 'GREEDY': puzzle.solve_greedy}.get(method, puzzle.solve_a_star)()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def main():
+    count = 100000
+    if len(sys.argv) >= 2:
+        count = int(sys.argv[1])
+    boards = random_boards(count)
+    # Only used to pack the boards, the same way the solver does
+    goal_grid = list(range(1, 9)) + [0]
+    puzzle = Puzzle("start", "goal", "UCS", False, start_grid=goal_grid, goal_grid=goal_grid)
+
+    old = measure(build_dict_nodes, boards)
+    new = measure(build_slot_nodes, boards, puzzle)
+    print(f"Nodes measured: {count}")
+    print(f"Bytes per stored node (dict layout): {old:.1f}")
+    print(f"Bytes per stored node (slots layout): {new:.1f}")
+    print(f"Reduction: {old / new:.1f}x")
+
+    if len(sys.argv) >= 4:
+        method = sys.argv[4].upper() if len(sys.argv) >= 5 else "UCS"
+        peak = measure_full_search(sys.argv[2], sys.argv[3], method)
+        print(f"Peak traced memory for {method} on {sys.argv[2]}: {peak / (1024 * 1024):.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import os
+import sys
+import json
+import random
+import argparse
+import platform
+import datetime
+import contextlib
+import tracemalloc
+
+import layered
+from boards import adjacent_cells, read_grid
+from expense_8_puzzle import Puzzle
+from heuristics import heuristic_argument
+
+DEFAULT_METHODS = "BFS,UCS,BIDIR,GREEDY,A*,IDA*,RBFS"
+
+def parse_buckets(text):
+    # "0-8,9-16,17-" -> [(0, 8), (9, 16), (17, None)]
+    buckets = []
+    for part in text.split(","):
+        low, _, high = part.partition("-")
+        buckets.append((int(low), int(high) if high else None))
+    return buckets
+
+def bucket_name(value, buckets):
+    for low, high in buckets:
+        if value >= low and (high is None or value <= high):
+            return f"{low}-{high}" if high is not None else f"{low}+"
+    return None
+
+def random_walk(goal_grid, board, steps, rng):
+    adjacent = adjacent_cells(board)
+    grid = goal_grid[:]
+    last = None
+    for _ in range(steps):
+        blank = grid.index(0)
+        cells = adjacent[blank]
+        # Never undo the previous move straight away
+        cells = [c for c in cells if c != last] or cells
+        cell = rng.choice(cells)
+        grid[blank], grid[cell] = grid[cell], 0
+        last = blank
+    return grid
+
+def run_quiet(puzzle):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        puzzle.solve()
+    return puzzle
+
+def generate_corpus(goal_grid, depth_buckets, cost_buckets, per_bucket, seed, max_walk):
+    # Random walks from the goal until every depth bucket holds per_bucket instances. Each
+    # is labelled with its optimal depth (fewest moves, from a breadth-first search) and its
+    # optimal cost (from A*); the cheapest path often takes more moves than the shortest.
+    board = int(round(len(goal_grid) ** 0.5))
+    shortest = "LAYERED" if layered.np is not None and layered.supports(board) else "BFS"
+    rng = random.Random(seed)
+    counts = {bucket_name(low, depth_buckets): 0 for low, _ in depth_buckets}
+    corpus = []
+    seen = set()
+    attempts = 0
+    while min(counts.values()) < per_bucket and attempts < 200 * per_bucket * len(counts):
+        attempts += 1
+        start = random_walk(goal_grid, board, rng.randint(1, max_walk), rng)
+        if tuple(start) in seen:
+            continue
+        seen.add(tuple(start))
+        depth = run_quiet(Puzzle("start", "goal", shortest, False, start_grid=start, goal_grid=goal_grid)).final_state.depth
+        depth_bucket = bucket_name(depth, depth_buckets)
+        if depth_bucket is None or counts[depth_bucket] >= per_bucket:
+            continue
+        cost = run_quiet(Puzzle("start", "goal", "A*", False, start_grid=start, goal_grid=goal_grid)).final_state.cost
+        counts[depth_bucket] += 1
+        corpus.append({
+            "id": f"d{depth_bucket}-{counts[depth_bucket]}",
+            "start": start,
+            "goal": goal_grid,
+            "depth": depth,
+            "cost": cost,
+            "depth_bucket": depth_bucket,
+            "cost_bucket": bucket_name(cost, cost_buckets),
+        })
+    return corpus
+
+def measure(job, method, args, workers = None):
+    def make():
+        return Puzzle("start", "goal", method, False, args.heuristic, args.pdb_dir, args.oracle_dir,
+                      start_grid=job["start"], goal_grid=job["goal"],
+                      node_limit=args.node_limit, time_limit=args.time_limit, workers=workers)
+
+    # Best of args.repeat runs, to keep scheduler noise out of the comparison
+    puzzle = min((run_quiet(make()) for _ in range(args.repeat)), key=lambda p: p.elapsed)
+    result = puzzle.summary()
+    del result["moves"]
+    result["id"] = job["id"]
+    result["depth_bucket"] = job["depth_bucket"]
+    result["cost_bucket"] = job["cost_bucket"]
+    result["optimal_cost"] = job["cost"]
+    result["nodes_per_sec"] = round(puzzle.nodes_expanded / puzzle.elapsed) if puzzle.elapsed > 0 else None
+    if args.memory and method != "HDA*":
+        # Separate run so tracemalloc does not slow down the timed one. HDA* keeps its
+        # nodes in the worker processes, which tracemalloc cannot see.
+        tracemalloc.start()
+        run_quiet(make())
+        result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+def aggregate(results):
+    groups = {}
+    for r in results:
+        for key in (f"{r['method']} depth {r['depth_bucket']}", f"{r['method']} cost {r['cost_bucket']}", f"{r['method']} all"):
+            groups.setdefault(key, []).append(r)
+    summary = {}
+    for key, runs in sorted(groups.items()):
+        seconds = sum(r["seconds"] for r in runs)
+        expanded = sum(r["nodes_expanded"] for r in runs)
+        summary[key] = {
+            "runs": len(runs),
+            "solved": sum(1 for r in runs if r["status"] == "solved"),
+            "optimal": sum(1 for r in runs if r["cost"] == r["optimal_cost"]),
+            "seconds": round(seconds, 6),
+            "nodes_per_sec": round(expanded / seconds) if seconds > 0 else None,
+            "nodes_expanded": expanded,
+            "nodes_generated": sum(r["nodes_generated"] for r in runs),
+            "peak_bytes": max((r.get("peak_bytes", 0) for r in runs), default=0),
+            "cost": sum(r["cost"] or 0 for r in runs),
+        }
+    return summary
+
+def scaling(corpus, counts, args):
+    # HDA* on the whole corpus for every worker count: the nodes/sec scaling curve. Nodes
+    # that A* would not expand raise nodes/sec too, so expansions are also given per A* one.
+    astar = sum(run_quiet(Puzzle("start", "goal", "A*", False, args.heuristic, args.pdb_dir, args.oracle_dir,
+                                 start_grid=job["start"], goal_grid=job["goal"],
+                                 node_limit=args.node_limit, time_limit=args.time_limit)).nodes_expanded
+                for job in corpus)
+    rows = []
+    for workers in counts:
+        runs = [measure(job, "HDA*", args, workers) for job in corpus]
+        seconds = sum(r["seconds"] for r in runs)
+        expanded = sum(r["nodes_expanded"] for r in runs)
+        rows.append({
+            "workers": workers,
+            "solved": sum(1 for r in runs if r["status"] == "solved"),
+            "optimal": sum(1 for r in runs if r["cost"] == r["optimal_cost"]),
+            "seconds": round(seconds, 6),
+            "nodes_expanded": expanded,
+            "expanded_vs_astar": round(expanded / astar, 3) if astar else None,
+            "nodes_per_sec": round(expanded / seconds) if seconds > 0 else None,
+            "speedup": round(rows[0]["seconds"] / seconds, 3) if rows and seconds > 0 else 1.0,
+        })
+        print(f"HDA* with {workers} workers: done", file=sys.stderr)
+    return rows
+
+def compare(current, baseline, threshold, min_seconds):
+    # Prints the ratio current/baseline per group and returns the regressed groups.
+    # Groups that ran for less than min_seconds are too noisy to judge on time.
+    regressions = []
+    print(f"{'group':<28}{'time':>10}{'expanded':>10}{'peak mem':>10}")
+    for key, now in current.items():
+        before = baseline.get(key)
+        if not before:
+            continue
+        ratios = []
+        for field in ("seconds", "nodes_expanded", "peak_bytes"):
+            ratios.append(now[field] / before[field] if now[field] and before[field] else None)
+        print(f"{key:<28}" + "".join(f"{r:>10.2f}" if r is not None else f"{'-':>10}" for r in ratios))
+        if before["seconds"] < min_seconds:
+            ratios[0] = None
+        if any(r is not None and r > 1 + threshold for r in ratios) or now["solved"] < before["solved"]:
+            regressions.append(key)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the solve methods on a graded instance corpus.")
+    parser.add_argument("goal_file")
+    parser.add_argument("--corpus", default="bench_corpus.jsonl", help="instance file; generated when it does not exist")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=None, help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.20, help="relative slowdown reported as a regression")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="shortest group time checked for slowdowns")
+    parser.add_argument("--methods", default=DEFAULT_METHODS)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per instance, the fastest is kept")
+    parser.add_argument("--depth-buckets", default="1-8,9-16,17-24,25-")
+    parser.add_argument("--cost-buckets", default="0-40,41-80,81-120,121-")
+    parser.add_argument("--per-bucket", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=2023)
+    parser.add_argument("--max-walk", type=int, default=120, help="longest random walk from the goal")
+    parser.add_argument("--node-limit", type=int, default=None)
+    parser.add_argument("--time-limit", type=float, default=60.0)
+    parser.add_argument("--heuristic", type=heuristic_argument, default="manhattan")
+    parser.add_argument("--pdb-dir", default=".")
+    parser.add_argument("--oracle-dir", default=".")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="skip the tracemalloc pass")
+    parser.add_argument("--scaling", default=None, metavar="COUNTS", help="also run HDA* with these worker counts, e.g. 1,2,4,8")
+    args = parser.parse_args()
+
+    goal_grid = read_grid(args.goal_file)
+    if os.path.exists(args.corpus):
+        with open(args.corpus) as f:
+            corpus = [json.loads(line) for line in f if line.strip()]
+    else:
+        corpus = generate_corpus(goal_grid, parse_buckets(args.depth_buckets), parse_buckets(args.cost_buckets),
+                                 args.per_bucket, args.seed, args.max_walk)
+        with open(args.corpus, "w") as f:
+            for job in corpus:
+                f.write(json.dumps(job) + "\n")
+    print(f"{len(corpus)} instances from {args.corpus}", file=sys.stderr)
+
+    results = []
+    for method in [m.strip().upper() for m in args.methods.split(",") if m.strip()]:
+        for job in corpus:
+            results.append(measure(job, method, args))
+        print(f"{method}: done", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "corpus": args.corpus,
+            "heuristic": args.heuristic,
+            "time_limit": args.time_limit,
+            "node_limit": args.node_limit,
+            "repeat": args.repeat,
+        },
+        "aggregate": aggregate(results),
+        "results": results,
+    }
+    if args.scaling:
+        report["scaling"] = scaling(corpus, [int(n) for n in args.scaling.split(",")], args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=1)
+
+    print(f"{'group':<28}{'solved':>8}{'seconds':>10}{'nodes/s':>10}{'expanded':>10}{'peak KB':>10}")
+    for key, row in report["aggregate"].items():
+        print(f"{key:<28}{row['solved']:>4}/{row['runs']:<3}{row['seconds']:>10.3f}{row['nodes_per_sec'] or 0:>10}{row['nodes_expanded']:>10}{row['peak_bytes'] // 1024:>10}")
+    if args.scaling:
+        print(f"\n{'workers':>8}{'optimal':>9}{'seconds':>10}{'expanded':>10}{'vs A*':>8}{'nodes/s':>10}{'speedup':>9}")
+        for row in report["scaling"]:
+            print(f"{row['workers']:>8}{row['optimal']:>5}/{len(corpus):<3}{row['seconds']:>10.3f}{row['nodes_expanded']:>10}{row['expanded_vs_astar'] or 0:>8.2f}{row['nodes_per_sec'] or 0:>10}{row['speedup']:>9.2f}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["aggregate"]
+        print(f"\nCompared with {args.baseline} (current / baseline):")
+        regressions = compare(report["aggregate"], baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print(f"Regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+
+# Board helpers shared by the solver, the table builders and the tools: a board is a flat
+# list of tiles, row by row, with 0 for the blank
+
+def read_grid(file_name):
+    # Board file: rows of whitespace separated tiles, optionally ended by END OF FILE
+    grid = []
+    with open(file_name, "r") as f:
+        for line in f:
+            if line.strip() == "END OF FILE":
+                break
+            grid.extend(map(int, line.split()))
+    return grid
+
+def cell_bits(size):
+    # Bits per packed cell: 4 up to the 15-puzzle, 5 for the 24-puzzle
+    return max(4, (size - 1).bit_length())
+
+def encode(grid, bits):
+    # Packs a board into a single int, bits per cell, so it can be hashed in O(1)
+    key = 0
+    for i, tile in enumerate(grid):
+        key |= tile << (bits * i)
+    return key
+
+def decode(key, bits, size):
+    mask = (1 << bits) - 1
+    return [(key >> (bits * i)) & mask for i in range(size)]
+
+def build_moves(board):
+    # For every blank position, the cells whose tile can slide into it, in the
+    # order successors are generated (left, up, right, down of the blank) together
+    # with the direction that tile moves
+    moves = []
+    for b in range(board * board):
+        row, col = divmod(b, board)
+        cells = []
+        if col > 0:
+            cells.append((b - 1, 'Right'))
+        if row > 0:
+            cells.append((b - board, 'Down'))
+        if col < board - 1:
+            cells.append((b + 1, 'Left'))
+        if row < board - 1:
+            cells.append((b + board, 'Up'))
+        moves.append(tuple(cells))
+    return moves
+
+def adjacent_cells(board):
+    # build_moves without the directions
+    return [tuple(cell for cell, _ in cells) for cells in build_moves(board)]
+
+def manhattan_table(goal_grid, board):
+    # table[tile][pos] is the Manhattan distance from pos to the tile's goal cell,
+    # weighted by the tile's cost. Moving a tile one cell changes h by at most that
+    # tile's cost, so the heuristic is consistent with the step-cost model.
+    size = board * board
+    table = [[0] * size for _ in range(size)]
+    for goal_pos, tile in enumerate(goal_grid):
+        if tile == 0:
+            continue
+        goal_row, goal_col = divmod(goal_pos, board)
+        for pos in range(size):
+            row, col = divmod(pos, board)
+            table[tile][pos] = tile * (abs(row - goal_row) + abs(col - goal_col))
+    return table
+
+def write_atomic(path, chunks):
+    # Written under a temporary name and renamed, so a reader never sees a partial file
+    # (solvers map the tables while others build them) and a failed write keeps the old one
+    partial = f"{path}.{os.getpid()}.tmp"
+    with open(partial, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(partial, path)
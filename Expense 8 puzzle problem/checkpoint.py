@@ -0,0 +1,94 @@
+import sys
+import struct
+from array import array
+
+from boards import write_atomic
+
+MAGIC = b"E8CKP2"
+# method, heuristic, board, bits per cell, bytes per key, weight, popped, expanded,
+# generated, max fringe, elapsed seconds, then the number of node records, closed keys
+# and frontier entries
+HEADER = struct.Struct("<8s32sBBBdQQQQdIII")
+# blank, moved tile, move, depth, g(n), h(n), parent record + 1 (0 for the start node)
+RECORD = struct.Struct("<BBBIIII")
+MOVE_CODES = (None, 'Left', 'Up', 'Right', 'Down')
+
+def collect_nodes(frontier):
+    # The frontier nodes and every ancestor they reach through 'pred', parents first, so
+    # a record can always refer to an earlier one. Returns (nodes, frontier indexes).
+    index = {}
+    nodes = []
+    for node in frontier:
+        chain = []
+        while node is not None and id(node) not in index:
+            chain.append(node)
+            node = node.pred
+        for n in reversed(chain):
+            index[id(n)] = len(nodes)
+            nodes.append(n)
+    return nodes, [index[id(n)] for n in frontier]
+
+def write_checkpoint(path, method, heuristic, weight, board, bits, start_grid, goal_grid, counters, elapsed, frontier, closed):
+    # counters is (popped, expanded, generated, max fringe size); frontier lists the open
+    # nodes in the order they should be pushed back, closed the packed keys of the closed set.
+    # The stored h(n) values belong to heuristic, so it is saved to be checked on resume.
+    if len(heuristic.encode()) > 32:
+        raise ValueError(f"heuristic name {heuristic!r} is too long for a checkpoint")
+    key_bytes = (board * board * bits + 7) // 8
+    nodes, order = collect_nodes(frontier)
+    index = {id(n): i for i, n in enumerate(nodes)}
+    parts = [MAGIC, HEADER.pack(method.encode(), heuristic.encode(), board, bits, key_bytes, weight, *counters, elapsed,
+                                len(nodes), len(closed), len(order)),
+             bytes(start_grid), bytes(goal_grid)]
+    for n in nodes:
+        parent = 0 if n.pred is None else index[id(n.pred)] + 1
+        parts.append(n.state.to_bytes(key_bytes, "little"))
+        parts.append(RECORD.pack(n.blank, n.val, MOVE_CODES.index(n.move), n.depth, n.cost, n.h, parent))
+    parts.append(b"".join(key.to_bytes(key_bytes, "little") for key in closed))
+    order = array('I', order)
+    if sys.byteorder != "little":
+        order.byteswap()
+    parts.append(order.tobytes())
+    write_atomic(path, parts)
+
+def read_checkpoint(path):
+    # Returns a dictionary with the header fields, 'nodes' as (key, blank, val, move, depth,
+    # g, h, parent) tuples with parent an index or None, 'closed' keys and 'frontier' indexes
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a checkpoint file")
+    offset = len(MAGIC)
+    (method, heuristic, board, bits, key_bytes, weight, popped, expanded, generated, max_fringe, elapsed,
+     node_count, closed_count, frontier_count) = HEADER.unpack_from(data, offset)
+    offset += HEADER.size
+    size = board * board
+    start_grid = list(data[offset:offset + size])
+    goal_grid = list(data[offset + size:offset + 2 * size])
+    offset += 2 * size
+    nodes = []
+    for _ in range(node_count):
+        key = int.from_bytes(data[offset:offset + key_bytes], "little")
+        blank, val, move, depth, cost, h, parent = RECORD.unpack_from(data, offset + key_bytes)
+        nodes.append((key, blank, val, MOVE_CODES[move], depth, cost, h, parent - 1 if parent else None))
+        offset += key_bytes + RECORD.size
+    closed = [int.from_bytes(data[i:i + key_bytes], "little")
+              for i in range(offset, offset + closed_count * key_bytes, key_bytes)]
+    offset += closed_count * key_bytes
+    frontier = array('I', data[offset:offset + frontier_count * 4])
+    if sys.byteorder != "little":
+        frontier.byteswap()
+    return {
+        "method": method.rstrip(b"\0").decode(),
+        "heuristic": heuristic.rstrip(b"\0").decode(),
+        "weight": weight,
+        "board": board,
+        "bits": bits,
+        "start_grid": start_grid,
+        "goal_grid": goal_grid,
+        "counters": (popped, expanded, generated, max_fringe),
+        "elapsed": elapsed,
+        "nodes": nodes,
+        "closed": closed,
+        "frontier": frontier,
+    }
@@ -1,541 +1,1044 @@
+import os
 import sys
+import json
+import time
+import signal
 import datetime
-import copy
+import argparse
+import heapq
+import itertools
+from collections import deque
+
+import pattern_db
+import oracle
+import layered
+import parallel_astar
+import checkpoint
+import heuristics
+import boards
+from trace_writer import TraceWriter, LEVELS as TRACE_LEVELS
+from metrics import SearchMetrics
+
+class Node:
+    # One search node. The board is kept packed in 'state' (Puzzle.bits per cell), 'blank' is
+    # where the blank sits, 'val'/'move' describe the tile move that produced it and
+    # 'pred' points at the parent node.
+    __slots__ = ('state', 'blank', 'val', 'move', 'depth', 'cost', 'h', 'algo', 'pred')
+
+    def __init__(self, state, blank, val, move, depth, cost, h, algo, pred):
+        self.state = state
+        self.blank = blank
+        self.val = val
+        self.move = move
+        self.depth = depth
+        self.cost = cost
+        self.h = h
+        self.algo = algo
+        self.pred = pred
+
+class Frontier:
+    # Binary-heap open list. Entries are (priority, seq, g, key, node); seq keeps ties in
+    # insertion order, which is what the old stable sort of the fringe list gave us.
+    # best_g drops dominated duplicates before they are pushed, and entries that get
+    # superseded by a cheaper path are left in the heap and skipped when popped.
+    def __init__(self, priority, closed, reopen = True):
+        self.priority = priority
+        self.closed = closed
+        self.reopen = reopen
+        self.heap = []
+        self.best_g = {}
+        self.counter = itertools.count()
+        self.live = 0
+
+    def __len__(self):
+        return self.live
+
+    def __iter__(self):
+        live = [e for e in self.heap if self.is_live(e)]
+        live.sort(key=lambda e: (e[0], e[1]))
+        return (e[4] for e in live)
+
+    def is_live(self, entry):
+        return entry[3] not in self.closed and self.best_g.get(entry[3]) == entry[2]
+
+    def append(self, node):
+        # is_duplicate() followed by push(), inlined because it runs for every successor
+        key = node.state
+        if key in self.closed:
+            return False
+        g = node.cost
+        best = self.best_g.get(key)
+        if best is not None:
+            if not self.reopen or best <= g:
+                return False
+            self.live -= 1
+        self.best_g[key] = g
+        heapq.heappush(self.heap, (self.priority(node), next(self.counter), g, key, node))
+        self.live += 1
+        return True
+
+    def is_duplicate(self, node):
+        # The node's state is closed, or already waiting with a g(n) at least as good
+        key = node.state
+        if key in self.closed:
+            return True
+        best = self.best_g.get(key)
+        return best is not None and (not self.reopen or best <= node.cost)
+
+    def push(self, node):
+        # Adds a node that is_duplicate() let through
+        key = node.state
+        if key in self.best_g:
+            self.live -= 1
+        self.best_g[key] = node.cost
+        heapq.heappush(self.heap, (self.priority(node), next(self.counter), node.cost, key, node))
+        self.live += 1
+
+    def min_priority(self):
+        # Priority of the next live entry, dropping stale entries off the top
+        while self.heap and not self.is_live(self.heap[0]):
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else float("inf")
+
+    def pop(self):
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+            if self.is_live(entry):
+                self.live -= 1
+                return entry[4]
+        raise IndexError("pop from empty frontier")
+
+    def settle(self, node):
+        # Forgets the best g(n) of a popped node, so a later and cheaper path to the same
+        # state counts as a new live entry. Only for searches that reopen states themselves.
+        self.best_g.pop(node.state, None)
+
+OPPOSITE = {'Left': 'Right', 'Right': 'Left', 'Up': 'Down', 'Down': 'Up'}
+METHODS = ("BFS", "LAYERED", "UCS", "BIDIR", "GREEDY", "A*", "WA*", "AWA*", "HDA*", "IDA*", "RBFS", "ORACLE")
+
+def permutation_parity(grid, board):
+    # Sliding a tile sideways keeps the tile order; sliding it vertically jumps it over
+    # board - 1 tiles. On odd widths that keeps the inversion parity, on even widths it
+    # flips it together with the blank's row, so these sums never change with a move.
+    tiles = [t for t in grid if t != 0]
+    inversions = 0
+    for i in range(len(tiles)):
+        for j in range(i + 1, len(tiles)):
+            if tiles[i] > tiles[j]:
+                inversions += 1
+    if board % 2 == 0:
+        inversions += grid.index(0) // board
+    return inversions % 2
+
+def is_solvable(start_grid, goal_grid, board):
+    return permutation_parity(start_grid, board) == permutation_parity(goal_grid, board)
+
+class SearchLimitReached(Exception):
+    # Raised from inside a search loop when the node or time budget runs out
+    pass
+
+# Methods whose whole search state is a fringe, a closed set and the counters
+CHECKPOINT_METHODS = ("BFS", "UCS", "GREEDY", "A*", "WA*")
 
 class Puzzle:
-    def __init__(self, start_file, goal_file, method, dump_flag):
+    # Neighbor tables depend only on the board width, so they are shared between instances.
+    # Heuristic tables, pattern databases and oracle tables depend only on the goal (and
+    # their directory) and are kept for the life of the process, so repeated solves in one
+    # process (batch workers, the solver service) start warm.
+    move_tables = {}
+    h_tables = {}
+    pattern_dbs = {}
+    oracles = {}
+
+    def __init__(self, start_file, goal_file, method, dump_flag, heuristic = "manhattan", pdb_dir = ".", oracle_dir = ".",
+                 start_grid = None, goal_grid = None, node_limit = None, time_limit = None,
+                 trace_level = "full", trace_gzip = False, trace_every = 1, trace_file = None, metrics = None,
+                 weight = 2.0, workers = None, checkpoint_file = None, checkpoint_every = 60.0, resume = False):
         self.start_file = start_file
         self.goal_file = goal_file
         self.method = method
         self.dump_flag = dump_flag
+        self.pdb_dir = pdb_dir
+        self.oracle_dir = oracle_dir
+        self.node_limit = node_limit
+        self.time_limit = time_limit
+        self.deadline = None
+        self.started = None
+        self.status = None
+        self.final_state = None
+        self.elapsed = 0.0
+        self.logger = None
+        self.pdbs = None
+        # Optional SearchMetrics; open_lists are the fringes it samples
+        self.metrics = metrics
+        self.open_lists = ()
+        # f(n) = g(n) + weight * h(n) for WA* and AWA*; the answer costs at most weight x optimal
+        if weight < 1:
+            raise ValueError("weight must be at least 1")
+        self.weight = weight
+        self.improvements = []
+        # Worker processes of the HDA* method
+        self.workers = workers or os.cpu_count()
+        self.per_worker_expanded = []
+        # Snapshots of the fringe, closed set and counters every checkpoint_every seconds
+        # and when a budget runs out; resume continues from checkpoint_file
+        if (checkpoint_file or resume) and method not in CHECKPOINT_METHODS:
+            raise ValueError(f"checkpoints are only supported for {', '.join(CHECKPOINT_METHODS)}")
+        if resume and not checkpoint_file:
+            raise ValueError("resume needs a checkpoint file")
+        if resume and not os.path.exists(checkpoint_file):
+            raise ValueError(f"{checkpoint_file} does not exist, nothing to resume")
+        self.checkpoint_file = checkpoint_file
+        self.checkpoint_every = checkpoint_every
+        self.next_checkpoint = None
+        self.resume = resume
+        self.elapsed_before = 0.0
+        self.interrupted = False
+        # summary: counters and result only, delta: one entry per expansion with the
+        # newly closed and generated nodes, full: closed list and fringe snapshots
+        # every trace_every expansions
+        if trace_level not in TRACE_LEVELS:
+            raise ValueError(f"trace level must be one of {', '.join(TRACE_LEVELS)}")
+        self.trace_level = trace_level
+        self.trace_gzip = trace_gzip
+        self.trace_every = max(1, trace_every)
+        self.trace_file = trace_file
+        self.trace_steps = dump_flag and trace_level != "summary"
+        self.trace_delta = dump_flag and trace_level == "delta"
+        self.trace_full = dump_flag and trace_level == "full"
         
         self.nodes_popped = 0
         self.nodes_expanded = 0
         self.nodes_generated = 1
         self.max_fringe_size = 1
+        self.iterations = 0
+        self.nodes_reexpanded = 0
         
         self.result_steps = []
         self.closed_steps = []
+        self.closed_keys = set()
 
-        self.start_grid = self.__get_file_content(self.start_file)
-        self.goal_grid = self.__get_file_content(self.goal_file)
-        
-        self.logger = None
+        # Grids can be passed in directly (batch mode) instead of being read from files
+        self.start_grid = list(start_grid) if start_grid is not None else boards.read_grid(self.start_file)
+        self.goal_grid = list(goal_grid) if goal_grid is not None else boards.read_grid(self.goal_file)
+        self.board = self.__get_board_size()
+        self.bits = boards.cell_bits(len(self.goal_grid))
+        self.mask = (1 << self.bits) - 1
+        self.goal_key = self.encode(self.goal_grid)
+        if self.board not in Puzzle.move_tables:
+            Puzzle.move_tables[self.board] = boards.build_moves(self.board)
+        self.moves = Puzzle.move_tables[self.board]
+        goal = tuple(self.goal_grid)
+        if goal not in Puzzle.h_tables:
+            Puzzle.h_tables[goal] = boards.manhattan_table(self.goal_grid, self.board)
+        self.h_table = Puzzle.h_tables[goal]
+        self.solvable = is_solvable(self.start_grid, self.goal_grid, self.board)
+        # One name from heuristics.HEURISTICS, or several separated by commas for their maximum
+        heuristic_names = heuristics.parse_names(heuristic)
+        self.heuristic_name = ",".join(heuristic_names)
+        if "pdb" in heuristic_names:
+            if (goal, pdb_dir) not in Puzzle.pattern_dbs:
+                Puzzle.pattern_dbs[(goal, pdb_dir)] = pattern_db.load_pattern_dbs(self.goal_grid, self.board, pdb_dir)
+            self.pdbs = Puzzle.pattern_dbs[(goal, pdb_dir)]
+        self.h_function = heuristics.make_heuristic(self, heuristic_names)
+        # The plain weighted Manhattan update is inlined in get_temp_node
+        self.h_inline = heuristic_names == ["manhattan"]
 
         if self.dump_flag:
             self.__create_logger()
 
-    def __get_file_content(self, file_name):
-        grid = []
-        with open(file_name, "r") as f:
-            for line in f:
-                if line == "END OF FILE":
-                    break
-                row = line.strip().split(" ")
-                grid.extend(map(int, row))
-        return grid
+    def __get_board_size(self):
+        # The width is taken from the files: 3 for the 8-puzzle, 4 for the 15-puzzle, ...
+        board = int(round(len(self.goal_grid) ** 0.5))
+        if board * board != len(self.goal_grid) or board < 2:
+            raise ValueError(f"{self.goal_file} does not describe a square board")
+        if sorted(self.goal_grid) != list(range(board * board)):
+            raise ValueError(f"{self.goal_file} must contain each tile 0..{board * board - 1} once")
+        if sorted(self.start_grid) != sorted(self.goal_grid):
+            raise ValueError(f"{self.start_file} and {self.goal_file} do not describe the same board")
+        return board
 
     def __create_logger(self):
-        now = datetime.datetime.now()
-        formatted = now.strftime("trace-%m_%d_%Y-%I_%M_%S_%p")
-        filename = f"{formatted}.txt"
-        self.logger = open(filename, "w")
+        filename = self.trace_file
+        if filename is None:
+            now = datetime.datetime.now()
+            formatted = now.strftime("trace-%m_%d_%Y-%I_%M_%S_%p")
+            filename = f"{formatted}.txt.gz" if self.trace_gzip else f"{formatted}.txt"
+        self.logger = TraceWriter(filename, self.trace_gzip)
         self.write_log(f"Command-Line Arguments : ['{self.start_file}', '{self.goal_file}', '{self.method}' , '{self.dump_flag}']")
         self.write_log(f"Method Selected : {self.method}")
+        self.write_log(f"Trace Level : {self.trace_level} (snapshots every {self.trace_every} expansions)")
         self.write_log(f"Running {self.method}")
         
-    def __del__(self):
+    def close_trace(self):
         if self.logger:
             self.logger.close()
 
+    def __del__(self):
+        # The pattern databases are shared through Puzzle.pattern_dbs and stay mapped
+        self.close_trace()
+
     def write_log(self, data, new_line = True):
-        if self.dump_flag and self.logger:
-            self.logger.write(data)
-            if new_line:
-                self.logger.write("\n")
+        if self.logger:
+            self.logger.write(data + "\n" if new_line else data)
+
+    def snapshot_due(self):
+        return self.trace_full and self.nodes_expanded % self.trace_every == 0
+
+    def log_closed(self):
+        closed = "".join(str(self.decode(key)) for key in self.closed_steps)
+        self.write_log(f"\tClosed: [{closed}]")
 
     def log_successors(self, count):
-        if self.dump_flag:
+        if self.trace_steps:
             self.write_log(f"\t{count} successors generated")
-            self.write_log("\tClosed: [", False)
-            for index in self.closed_steps:
-                self.write_log(f"{index['node']}", False)
-            self.write_log("]")
+            if self.snapshot_due():
+                self.log_closed()
 
     def log_no_successors(self,item):
-        if self.dump_flag:
+        if self.trace_steps:
             self.write_log(f"\t{item} is already in closed so 0 successors")
-            self.write_log("\tClosed: [", False)
-            for index in self.closed_steps:
-                self.write_log(f"{index['node']}", False)
-            self.write_log("]")
+            if self.snapshot_due():
+                self.log_closed()
     
     def log_fringe(self, fringe):
-        if self.dump_flag:
-            self.write_log("\tFringe: [")
-            for i in fringe:
-                self.write_log(f"\t\t< state = {i['node']}, action={{Move {i['val']} {i['move']}}}, d = {i['depth']}, g(n) = {i['cost']}, f(n) = {i['algo']}, Parent = Pointer to {i['prev']}")
-            self.write_log("]") 
+        if self.snapshot_due():
+            lines = "".join(f"\t\t{self.node_str(i)}\n" for i in fringe)
+            self.write_log(f"\tFringe: [\n{lines}]")
          
     def generate_results(self,  state):
+        self.final_state = state
+        if self.status is None:
+            self.status = "solved" if state else "no_solution"
         print("")
         print(f"Nodes Popped: {self.nodes_popped}")
         print(f"Nodes Expanded: {self.nodes_expanded}")
         print(f"Nodes Generated: {self.nodes_generated}")
         print(f"Max Fringe Size: {self.max_fringe_size}")
-        if self.dump_flag:
+        if self.method == "IDA*":
+            print(f"Iterations: {self.iterations}")
+        if self.method in ("IDA*", "RBFS"):
+            print(f"Nodes Re-expanded: {self.nodes_reexpanded}")
+        if self.logger:
+            # Counters are logged at every trace level
             self.write_log(f"Nodes Popped: {self.nodes_popped}")
             self.write_log(f"Nodes Expanded: {self.nodes_expanded}")
             self.write_log(f"Nodes Generated: {self.nodes_generated}")
             self.write_log(f"Max Fringe Size: {self.max_fringe_size}")
+            if self.method == "IDA*":
+                self.write_log(f"Iterations: {self.iterations}")
+            if self.method in ("IDA*", "RBFS"):
+                self.write_log(f"Nodes Re-expanded: {self.nodes_reexpanded}")
 
         if state:
-            print(f"Solution Found at depth {state['depth']} with cost of {state['cost']}.")
+            print(f"Solution Found at depth {state.depth} with cost of {state.cost}.")
             result = self.solution_found(state)
             print("Steps:")
             for i in range(1, len(result)):
                 print("\t"+result[i])
+            if self.logger:
+                self.write_log(f"Solution Found at depth {state.depth} with cost of {state.cost}.")
+                self.write_log("".join(f"\t{step}\n" for step in result[1:]), False)
+        elif self.status == "unsolvable":
+            print("No Solution (start and goal are in different parity classes)")
+        elif self.status in ("node_limit", "time_limit", "interrupted"):
+            if self.status == "interrupted":
+                print("Search Stopped: interrupted")
+            else:
+                print(f"Search Stopped: {self.status.replace('_', ' ')} reached")
+            self.report_partial()
+        elif self.status == "unsupported":
+            print("Not Solved: the method does not support this board size")
         else:
             print("No Solution")
+
+    def report_partial(self):
+        # What a stopped search still tells us: the closed and fringe sizes and, for
+        # methods that pop in order of a lower bound, how good the answer must at least be
+        fringe = list(self.open_lists[0]) if self.open_lists else []
+        lines = [f"Closed States: {len(self.closed_keys)}", f"Fringe Size: {len(fringe)}"]
+        if fringe and self.method == "BFS":
+            lines.append(f"No solution with fewer than {fringe[0].depth} moves")
+        elif fringe and self.method in ("UCS", "A*"):
+            lines.append(f"No solution cheaper than {min(n.algo if self.method == 'A*' else n.cost for n in fringe)}")
+        for line in lines:
+            print(line)
+            self.write_log(line)
+
+    def check_budget(self):
+        # Called once per pop; the clock and the interrupt flag are only read every 256 pops
+        if self.node_limit is not None and self.nodes_expanded >= self.node_limit:
+            self.status = "node_limit"
+            raise SearchLimitReached(self.status)
+        if self.nodes_popped & 255 == 0:
+            if self.interrupted:
+                self.status = "interrupted"
+                raise SearchLimitReached(self.status)
+            if self.deadline is not None or self.next_checkpoint is not None:
+                now = time.perf_counter()
+                if self.deadline is not None and now > self.deadline:
+                    self.status = "time_limit"
+                    raise SearchLimitReached(self.status)
+                if self.next_checkpoint is not None and now >= self.next_checkpoint:
+                    self.save_checkpoint()
+                    # Counted from the end of the write, which can take seconds on a large fringe
+                    self.next_checkpoint = time.perf_counter() + self.checkpoint_every
+
+    def solve(self):
+        # Runs the selected method, enforcing node_limit and time_limit
+        solvers = {
+            "BFS": self.solve_bfs,
+            "LAYERED": self.solve_layered,
+            "UCS": self.solve_ucs,
+            "BIDIR": self.solve_bidirectional,
+            "GREEDY": self.solve_greedy,
+            "WA*": self.solve_weighted_a_star,
+            "AWA*": self.solve_anytime_a_star,
+            "HDA*": self.solve_parallel_a_star,
+            "IDA*": self.solve_ida_star,
+            "RBFS": self.solve_rbfs,
+            "ORACLE": self.solve_oracle,
+        }
+        if self.metrics:
+            self.metrics.attach(self)
+        started = self.started = time.perf_counter()
+        if not self.solvable:
+            # Half of all boards can never reach the goal; no need to search them
+            self.status = "unsolvable"
+            self.generate_results(None)
+            self.close_trace()
+            return None
+        if self.time_limit is not None:
+            self.deadline = started + self.time_limit
+        if self.checkpoint_file:
+            self.next_checkpoint = started + self.checkpoint_every
+        solver = solvers.get(self.method, self.solve_a_star)
+        try:
+            if self.metrics:
+                self.metrics.run(solver)
+            else:
+                solver()
+        except SearchLimitReached:
+            if self.checkpoint_file:
+                # Budget spent: save where the search stopped so it can be resumed
+                self.save_checkpoint()
+                print(f"Checkpoint written to {self.checkpoint_file}")
+            self.generate_results(None)
+        finally:
+            self.close_trace()
+        self.elapsed = self.elapsed_before + time.perf_counter() - started
+        if self.checkpoint_file and self.status in ("solved", "no_solution") and os.path.exists(self.checkpoint_file):
+            # The search is finished, so the snapshot no longer describes anything to resume
+            os.remove(self.checkpoint_file)
+        return self.final_state
+
+    def save_checkpoint(self):
+        # Fringe nodes in the order they are popped, so a resumed search keeps the same tie-breaking
+        fringe = list(self.open_lists[0])
+        counters = (self.nodes_popped, self.nodes_expanded, self.nodes_generated, self.max_fringe_size)
+        elapsed = self.elapsed_before + time.perf_counter() - self.started
+        checkpoint.write_checkpoint(self.checkpoint_file, self.method, self.heuristic_name, self.weight, self.board, self.bits,
+                                    self.start_grid, self.goal_grid, counters, elapsed, fringe, self.closed_keys)
+        self.write_log(f"Checkpoint: {len(fringe)} fringe nodes, {len(self.closed_keys)} closed states")
+
+    def restore_checkpoint(self, fringe):
+        # Refills fringe and the closed set from checkpoint_file; False when not resuming
+        if not self.resume:
+            return False
+        saved = checkpoint.read_checkpoint(self.checkpoint_file)
+        if saved["method"] != self.method:
+            raise ValueError(f"{self.checkpoint_file} was written by {saved['method']}, not {self.method}")
+        if saved["start_grid"] != self.start_grid or saved["goal_grid"] != self.goal_grid:
+            raise ValueError(f"{self.checkpoint_file} was written for a different start or goal")
+        # The saved h(n) and f(n) values only fit the heuristic and weight they were made with
+        if self.method in ("GREEDY", "A*", "WA*") and saved["heuristic"] != self.heuristic_name:
+            raise ValueError(f"{self.checkpoint_file} was written with the {saved['heuristic']} heuristic, not {self.heuristic_name}")
+        if self.method == "WA*" and saved["weight"] != self.weight:
+            raise ValueError(f"{self.checkpoint_file} was written with weight {saved['weight']}, not {self.weight}")
+        self.nodes_popped, self.nodes_expanded, self.nodes_generated, self.max_fringe_size = saved["counters"]
+        self.elapsed_before = saved["elapsed"]
+        if self.time_limit is not None:
+            # Like the node limit, the time limit covers every run of the search
+            self.deadline = self.started + self.time_limit - self.elapsed_before
+        self.closed_keys.update(saved["closed"])
+        if self.trace_full:
+            self.closed_steps.extend(saved["closed"])
+        nodes = []
+        for key, blank, val, move, depth, cost, h, parent in saved["nodes"]:
+            pred = None if parent is None else nodes[parent]
+            nodes.append(Node(key, blank, val, move, depth, cost, h, self.get_algo(cost, h), pred))
+        for i in saved["frontier"]:
+            fringe.append(nodes[i])
+        print(f"Resumed from {self.checkpoint_file}: {len(saved['frontier'])} fringe nodes, {len(saved['closed'])} closed states")
+        return True
+
+    def summary(self):
+        # Machine-readable result of the last solve()
+        state = self.final_state
+        result = {
+            "method": self.method,
+            "status": self.status,
+            "cost": state.cost if state else None,
+            "depth": state.depth if state else None,
+            "moves": self.solution_found(state)[1:] if state else [],
+            "nodes_popped": self.nodes_popped,
+            "nodes_expanded": self.nodes_expanded,
+            "nodes_generated": self.nodes_generated,
+            "max_fringe_size": self.max_fringe_size,
+            "seconds": round(self.elapsed, 6),
+        }
+        if self.method in ("WA*", "AWA*"):
+            result["weight"] = self.weight
+        if self.improvements:
+            result["improvements"] = self.improvements
+        if self.metrics:
+            result["metrics"] = self.metrics.summary()
+        return result
+
+    def track(self, *fringes):
+        # Registers the open lists of the running search with the metrics, if any
+        self.open_lists = fringes
+        if self.metrics:
+            for fringe in fringes:
+                self.metrics.track(fringe)
     #
+    def encode(self, grid):
+        return boards.encode(grid, self.bits)
+
+    def decode(self, key):
+        return boards.decode(key, self.bits, len(self.goal_grid))
+
+    def add_closed(self, current):
+        self.closed_keys.add(current.state)
+        if self.trace_full:
+            # Only full snapshots need the closed list in visiting order
+            self.closed_steps.append(current.state)
+        elif self.trace_delta:
+            self.write_log(f"\tClosed += {self.decode(current.state)}")
+
     def is_closed(self, current):
-        for c in self.closed_steps:
-            if current['node'] == c['node']:
-                return True
-        return False
+        return current.state in self.closed_keys
     
     def solution_found(self, route):
+        # Walks the parent references back to the start node, O(depth)
         result=[]
-        
-        def item_exist(**params):
-            for item in self.closed_steps:
-                if all(item.get(key) == value for key, value in params.items()):
-                    return item
-            return None
-        result.insert(0, f"Move {route['val']} {route['move']}" )
-        curr = copy.deepcopy(route)
-        while (curr['parent'] is not None):         
-            depth = curr['depth']-1
-            cost = curr['cost']-curr['val']
-            parent_idx = curr['parent']
-            node = curr['node']
-            index = curr['ind']
-            node[index],  node[parent_idx] = node[parent_idx], 0
-
-            item = item_exist( depth=depth, cost=cost, ind=parent_idx, node=node)
-            result.insert(0, f"Move {item['val']} {item['move']}" )
-            curr = copy.deepcopy(item)
+        curr = route
+        while curr is not None:
+            result.append(f"Move {curr.val} {curr.move}")
+            curr = curr.pred
+        result.reverse()
         return result
     
     def heuristic(self, curr):
-        board = 3
-        heu, quo, rem, temp = 0, 0, 0, 0
-        for i in self.goal_grid:
-            goal_i = self.goal_grid.index(i)
-            curr_i = curr.index(i)
-            if ((goal_i==2 and curr_i==3) or (goal_i==3 and curr_i==2) or (goal_i==5 and curr_i==6) or (goal_i==6 and curr_i==5)):
-                req =  (goal_i+curr_i)%board
-                diff = abs(goal_i-curr_i)
-                temp = (diff+req)*i
-                # print (temp)
-                heu+= temp
-            else:
-                diff = abs(goal_i-curr_i)
-                if (diff!=0):
-                    rem = diff%board
-                    quo =  diff//board
-                    temp = (rem+quo)*i
-                    heu+=temp
-        return heu
+        return self.h_function.value(curr)
     
-    def get_temp_node(self, state, state_cp, ind, val, parent, move, prev = None):
-        if state:
-            temp_node =  {'node': state_cp['node'], 'ind': ind, 'val': val, 'parent': parent, 'move': move, 'depth': state['depth'] + 1, 'cost': state_cp['cost'] + val,'heugreedy': self.heuristic(state_cp['node']), 'heuastar': 0, 'prev': prev }
-        else:
-            temp_node =  {'node': state_cp['node'], 'ind': ind, 'val': val, 'parent': parent, 'move': move, 'depth': state_cp['depth'] + 1, 'cost': state_cp['cost'] + val,'heugreedy': self.heuristic(state_cp['node']), 'heuastar': 0, 'prev': prev }
-        
+    def get_algo(self, cost, heu):
         if (self.method == 'GREEDY'):
-            temp_node['algo'] = temp_node['heugreedy']
-        elif (self.method == 'A*'):
-            temp_node['heuastar'] = temp_node['cost'] + temp_node['heugreedy']
-            temp_node['algo'] = temp_node['heuastar']
+            return heu
+        elif (self.method in ('A*', 'IDA*', 'RBFS')):
+            return cost + heu
+        elif (self.method in ('WA*', 'AWA*')):
+            return cost + self.weight * heu
+        return 0
+
+    def get_temp_node(self, state, key, ind, val, move):
+        if self.h_inline:
+            # Only the moved tile changes position, from ind to the parent's blank cell
+            table = self.h_table[val]
+            heu = state.h - table[ind] + table[state.blank]
         else:
-            temp_node['algo'] = 0
-        return temp_node
+            heu = self.h_function.child(state, key, ind, val)
+        cost = state.cost + val
+        return Node(key, ind, val, move, state.depth + 1, cost, heu, self.get_algo(cost, heu), state)
 
-    def neighbors (self, state, fringe, prev = None):
-        curr = state['node']
-        curr_idx = curr.index(0)
+    def get_start_node(self):
+        heu = self.heuristic(self.start_grid)
+        return Node(self.encode(self.start_grid), self.start_grid.index(0), 0, None, 0, 0, heu, self.get_algo(0, heu), None)
+
+    def neighbors (self, state, fringe):
+        # The tile at t slides into the blank at b, which only moves its bits in the packed key
+        key = state.state
+        b = state.blank
+        bits = self.bits
         self.nodes_expanded+=1
         res = 0
-        left_idx, left = -1, -1
-        right_idx, right = -1, -1
-        up_idx, up = -1, -1
-        down_idx, down = -1, -1
-        #left
-        if (curr_idx not in [0, 3, 6]): 
-            left_idx = curr_idx-1
-            left = curr[left_idx]
-        #right
-        if (curr_idx not in [2, 5, 8]): 
-            right_idx = curr_idx+1
-            right = curr[right_idx]
-        #up
-        if (curr_idx not in [0, 1, 2]):
-            up_idx = curr_idx-3
-            up = curr[up_idx]  
-        #down
-        if (curr_idx not in [6, 7, 8]): 
-            down_idx = curr_idx+3
-            down = curr[down_idx]
-
-        if (left!=-1): 
-            state_cp = copy.deepcopy(state)
-            state_cp['node'][curr_idx], state_cp['node'][left_idx] = state_cp['node'][left_idx], state_cp['node'][curr_idx]
-            fringe.append(self.get_temp_node(None, state_cp, left_idx, left, curr_idx, 'Right', prev))
-            self.nodes_generated+=1
-            res+=1
-
-        if (up!=-1):
-            state_cp = copy.deepcopy(state)
-            state_cp['node'][curr_idx], state_cp['node'][up_idx] = state_cp['node'][up_idx], state_cp['node'][curr_idx]
-
-            fringe.append(self.get_temp_node(state, state_cp, up_idx, up, curr_idx, 'Down', prev))    
-            self.nodes_generated+=1
-            res+=1
-        if (right!=-1): #move blank right
-            state_cp = copy.deepcopy(state)
-            state_cp['node'][curr_idx], state_cp['node'][right_idx] = state_cp['node'][right_idx], state_cp['node'][curr_idx]
-            fringe.append(self.get_temp_node(None, state_cp, right_idx, right, curr_idx, 'Left', prev))    
-            self.nodes_generated+=1
-            res+=1
-        if (down!=-1): #move blank down
-            state_cp = copy.deepcopy(state)
-            state_cp['node'][curr_idx], state_cp['node'][down_idx] = state_cp['node'][down_idx], state_cp['node'][curr_idx]
-            fringe.append(self.get_temp_node(None, state_cp, down_idx, down, curr_idx, 'Up', prev))  
+        for t, move in self.moves[b]:
+            val = (key >> (bits * t)) & self.mask
+            child = key + (val << (bits * b)) - (val << (bits * t))
+            node = self.get_temp_node(state, child, t, val, move)
+            fringe.append(node)
+            if self.trace_delta:
+                self.write_log(f"\t\t+ {self.node_str(node)}")
             self.nodes_generated+=1
             res+=1
         return res
 
-    def get_successors(self, current, prev):
-        if self.dump_flag:
-            action = f"{{Move {current['val']} {current['move']}}}"
-            if current['move'] is None:
-                action = "Start"
-            return f"< state = {current['node']}, action={{{action}}}, g(n) = {current['cost']}, d = {current['depth']}, f(n) = {current['algo']}, Parent = Pointer to {{{prev}}} >:"
+    def node_str(self, node, parent = True):
+        action = "Start" if node.move is None else f"Move {node.val} {node.move}"
+        text = f"< state = {self.decode(node.state)}, action={{{action}}}, g(n) = {node.cost}, d = {node.depth}, f(n) = {node.algo}"
+        if not parent:
+            return text + " >"
+        # Only the parent itself is printed, not its whole ancestry
+        pred = "{None}" if node.pred is None else self.node_str(node.pred, False)
+        return f"{text}, Parent = Pointer to {pred} >"
+
+    def get_successors(self, current):
+        if self.trace_steps:
+            return self.node_str(current) + ":"
         return None
     
     def solve_bfs(self):
         print("Solving using Breadth First Search")
         res = 0
-        fringe=[] 
-        start_idx = self.start_grid.index(0)
-        prev = None
-        fringe.append(
-            {
-                'node':self.start_grid, 
-                'ind':start_idx, 
-                'val':0, 
-                'move':None, 
-                'depth':0, 
-                'cost':0, 
-                'parent':None, 
-                'algo':0,
-                'prev': None
-            })
+        # With metrics the fringe is a deque subclass whose pushes and pops can be timed
+        fringe = self.metrics.queue() if self.metrics else deque()
+        self.track(fringe)
+        if not self.restore_checkpoint(fringe):
+            fringe.append(self.get_start_node())
         final_state=None
 
         while len(fringe)>0:
+            # Checked before the pop, so a checkpoint still holds the node about to be taken
+            self.check_budget()
             self.nodes_popped+=1
             current = fringe[0]
-            if self.dump_flag:
-                successor_str = self.get_successors(current, prev)
-                self.write_log(f"Generating successors to {successor_str}")
-                prev = successor_str
-
-            if current['node']==self.goal_grid:
-                self.closed_steps.append(
-                    {
-                        'node': current['node'], 
-                        'ind':current['ind'], 
-                        'val':current['val'], 
-                        'cost':current['cost'], 
-                        'move':current['move'], 
-                        'depth':current['depth'], 
-                        'parent':current['parent'], 
-                        'algo':current['algo']
-                    })
+            if self.trace_steps:
+                self.write_log(f"Generating successors to {self.get_successors(current)}")
+
+            if current.state==self.goal_key:
+                self.add_closed(current)
                 self.log_successors(res)
-                final_state=copy.deepcopy(current)
+                final_state=current
                 break
             elif self.is_closed(current): 
                 self.max_fringe_size=max(self.max_fringe_size, len(fringe))
-                self.log_no_successors(fringe[0]['node'])
+                self.log_no_successors(self.decode(current.state))
                 self.log_fringe(fringe)
-                del fringe[0]
+                fringe.popleft()
                 
             else:
 
-                self.closed_steps.append(
-                    {
-                        'node': current['node'], 
-                        'ind':current['ind'], 
-                        'val':current['val'], 
-                        'parent':current['parent'], 
-                        'move':current['move'], 
-                        'depth':current['depth'], 
-                        'cost':current['cost'], 
-                        'algo':current['algo']
-                    })
+                self.add_closed(current)
                 
-                res = self.neighbors(current, fringe, None)
-                del fringe[0]
+                res = self.neighbors(current, fringe)
+                fringe.popleft()
                 self.max_fringe_size=max(self.max_fringe_size, len(fringe))
                 self.log_successors(res)
                 self.log_fringe(fringe)
 
         self.generate_results(final_state)
         
-    def solve_ucs(self):
-        print("Solving using Uniform Cost Search")
+    def solve_layered(self):
+        # Same fewest-moves search as solve_bfs, but each layer is expanded as a whole in
+        # numpy; among paths of equal length it may pick a different one than solve_bfs
+        print("Solving using Layered Breadth First Search")
+        if not layered.supports(self.board):
+            print("The layered method is only available for boards up to 4x4")
+            self.status = "unsupported"
+            self.generate_results(None)
+            return
+        engine = layered.LayeredBFS(self.goal_grid, self.board)
+
+        def on_layer(expanded, size):
+            self.nodes_expanded = self.nodes_popped = expanded
+            self.max_fringe_size = max(self.max_fringe_size, size)
+            if self.node_limit is not None and expanded >= self.node_limit:
+                self.status = "node_limit"
+                raise SearchLimitReached(self.status)
+            if self.deadline is not None and time.perf_counter() > self.deadline:
+                self.status = "time_limit"
+                raise SearchLimitReached(self.status)
+            self.write_log(f"Layer of {size} states, {expanded} expanded so far")
+
+        path, self.nodes_expanded, self.nodes_generated = engine.search(self.start_grid, on_layer)
+        self.nodes_popped = self.nodes_expanded
+        final_state=None
+        if path:
+            # Rebuild the Node chain; each step's blank cell is where the moved tile came from
+            current = self.get_start_node()
+            for key in path[1:]:
+                board = self.decode(key)
+                t = board.index(0)
+                val = board[current.blank]
+                move = next(m for cell, m in self.moves[current.blank] if cell == t)
+                current = self.get_temp_node(current, key, t, val, move)
+            final_state=current
+            self.nodes_popped+=1
+        self.generate_results(final_state)
+
+    def best_first(self, fringe):
         res = 0
-        fringe=[] 
-        start_idx = self.start_grid.index(0)
-        prev = None
-        fringe.append(
-            {
-                'node':self.start_grid, 
-                'ind':start_idx, 
-                'val':0, 
-                'parent':None, 
-                'move':None, 
-                'depth':0, 
-                'cost':0, 
-                'algo':0,
-                'prev': None
-            })
+        self.track(fringe)
+        if not self.restore_checkpoint(fringe):
+            fringe.append(self.get_start_node())
         final_state=None
 
         while len(fringe)>0:
+            # Checked before the pop, so a checkpoint still holds the node about to be taken
+            self.check_budget()
+            current = fringe.pop()
             self.nodes_popped+=1
-            current = fringe[0]
-            if self.dump_flag:
-                successor_str = self.get_successors(current, prev)
-                self.write_log(f"Generating successors to {successor_str}")
-                prev = None
-
-            if current['node']==self.goal_grid:
-                self.closed_steps.append(
-                    {
-                        'node': current['node'], 
-                        'ind':current['ind'], 
-                        'val':current['val'], 
-                        'parent':current['parent'], 
-                        'move':current['move'], 
-                        'depth':current['depth'], 
-                        'cost':current['cost'], 
-                        'algo':current['algo']
-                    })
+            if self.trace_steps:
+                self.write_log(f"Generating successors to {self.get_successors(current)}")
+
+            self.add_closed(current)
+            if current.state==self.goal_key:
                 self.log_successors(res)
-                final_state=copy.deepcopy(current)
+                final_state=current
                 break
-            elif self.is_closed(current): 
-                self.max_fringe_size=max(self.max_fringe_size, len(fringe))
-                self.log_no_successors(fringe[0]['node'])
-                self.log_fringe(fringe)
-                del fringe[0]
-            else:
 
-                self.closed_steps.append(
-                    {
-                        'node': current['node'], 
-                        'ind':current['ind'], 
-                        'val':current['val'], 
-                        'parent':current['parent'], 
-                        'move':current['move'], 
-                        'depth':current['depth'], 
-                        'cost':current['cost'], 
-                        'algo':current['algo']
-                    })
-                res = self.neighbors(current, fringe, None)
-                del fringe[0]
-                self.max_fringe_size=max(self.max_fringe_size, len(fringe))
-                fringe = sorted(fringe, key=lambda x: x['cost'])
-                self.log_successors(res)
-                self.log_fringe(fringe)
+            res = self.neighbors(current, fringe)
+            self.max_fringe_size=max(self.max_fringe_size, len(fringe))
+            self.log_successors(res)
+            self.log_fringe(fringe)
 
         self.generate_results(final_state)
 
+    def solve_ucs(self):
+        print("Solving using Uniform Cost Search")
+        fringe = Frontier(lambda x: x.cost, self.closed_keys)
+        self.best_first(fringe)
+
     def solve_greedy(self):
         print("Solving using Greedy Search")
+        # Greedy never revisits a state: a later copy has the same h and would always pop second
+        fringe = Frontier(lambda x: x.algo, self.closed_keys, reopen=False)
+        self.best_first(fringe)
+
+    def solve_a_star(self):
+        print("Solving using A* Search")
+        fringe = Frontier(lambda x: x.algo, self.closed_keys)
+        self.best_first(fringe)
+        
+    def solve_weighted_a_star(self):
+        print(f"Solving using Weighted A* Search (w = {self.weight})")
+        # With a consistent h, a node closed by WA* already has g(n) within w x optimal, so
+        # closed states are not reopened and the answer still costs at most w x optimal
+        fringe = Frontier(lambda x: x.algo, self.closed_keys)
+        self.best_first(fringe)
+
+    def report_improvement(self, cost, bound):
+        elapsed = time.perf_counter() - self.started
+        self.improvements.append({"cost": cost, "bound": round(bound, 4), "seconds": round(elapsed, 6),
+                                  "nodes_expanded": self.nodes_expanded})
+        print(f"Solution cost {cost} after {self.nodes_expanded} expansions ({elapsed:.3f}s), within {bound:.3f} x optimal")
+        self.write_log(f"Improved solution: cost {cost}, bound {bound:.3f}")
+
+    def solve_anytime_a_star(self):
+        # Anytime weighted A*: searches in WA* order, keeps going after the first solution and
+        # prunes every node whose g(n) + h(n) cannot beat the best cost found so far. The
+        # smallest g(n) + h(n) left in the fringe is a lower bound on the optimal cost, so each
+        # answer comes with its suboptimality bound; an empty fringe proves the last one optimal.
+        print(f"Solving using Anytime Weighted A* Search (w = {self.weight})")
+        # Expanded states are reopened when they are reached more cheaply, so instead of a
+        # closed set the best g(n) each state was expanded with is kept
+        fringe = Frontier(lambda x: x.algo, set())
+        self.track(fringe)
+        fringe.append(self.get_start_node())
+        expanded = {}
+        incumbent = None
+        best = float("inf")
         res = 0
-        fringe=[] 
-        start_idx = self.start_grid.index(0)
-        prev = None
-        fringe.append(
-            {
-                'node':self.start_grid, 
-                'ind':start_idx, 
-                'val':0, 
-                'parent':None, 
-                'move':None, 
-                'depth':0, 
-                'cost':0, 
-                'algo':self.heuristic(self.start_grid),
-                'prev': None
-            })
-        final_state=None
-        while len(fringe)>0:
-            self.nodes_popped+=1
-            current = fringe[0]
-            if self.dump_flag:
-                successor_str = self.get_successors(current, prev)
-                self.write_log(f"Generating successors to {successor_str}")
-                prev = successor_str
-
-            if current['node']==self.goal_grid:
-                self.closed_steps.append(
-                    {
-                        'node': current['node'], 
-                        'ind':current['ind'], 
-                        'val':current['val'], 
-                        'parent':current['parent'], 
-                        'move':current['move'], 
-                        'depth':current['depth'], 
-                        'cost':current['cost'], 
-                        'algo':current['algo']
-                    })
-                self.log_successors(res)
-                final_state=copy.deepcopy(current)
-                break
-            elif self.is_closed(current): 
-                self.max_fringe_size=max(self.max_fringe_size, len(fringe))
-                self.log_no_successors(fringe[0]['node'])
-                self.log_fringe(fringe)
-                del fringe[0]
-            else:
-                self.closed_steps.append(
-                    {
-                        'node': current['node'], 
-                        'ind':current['ind'], 
-                        'val':current['val'], 
-                        'parent':current['parent'], 
-                        'move':current['move'], 
-                        'depth':current['depth'], 
-                        'cost':current['cost'], 
-                        'algo':current['algo']
-                    })
-                res = self.neighbors(current, fringe, prev)
-                del fringe[0]
+
+        def bound():
+            # best / (smallest g(n) + h(n) that could still lead to a cheaper solution)
+            lower = min((n.cost + n.h for n in fringe), default=best)
+            return best / lower if 0 < lower < best else 1.0
+
+        try:
+            while len(fringe)>0:
+                current = fringe.pop()
+                fringe.settle(current)
+                self.nodes_popped+=1
+                self.check_budget()
+                if current.cost + current.h >= best:
+                    continue
+                if self.trace_steps:
+                    self.write_log(f"Generating successors to {self.get_successors(current)}")
+                self.add_closed(current)
+                if current.state==self.goal_key:
+                    incumbent, best = current, current.cost
+                    self.report_improvement(best, bound())
+                    continue
+
+                expanded[current.state] = current.cost
+                children = []
+                res = self.neighbors(current, children)
+                for child in children:
+                    if child.cost + child.h < best and child.cost < expanded.get(child.state, best):
+                        fringe.append(child)
                 self.max_fringe_size=max(self.max_fringe_size, len(fringe))
-                fringe = sorted(fringe, key=lambda x: x['algo'])
                 self.log_successors(res)
                 self.log_fringe(fringe)
-        self.generate_results(final_state)
+        except SearchLimitReached:
+            # Out of budget: the best solution so far is returned with its current bound
+            if incumbent:
+                print(f"Best solution when stopped: cost {best}, within {bound():.3f} x optimal")
+        if incumbent and self.status is None:
+            print("Fringe exhausted: the last solution is optimal")
+        self.generate_results(incumbent)
 
-    def solve_a_star(self):
-        print("Solving using A* Search")
-        res = 0
-        fringe=[] 
-        start_idx = self.start_grid.index(0)
-        prev = None
-        fringe.append(
-            {
-                'node':self.start_grid, 
-                'ind':start_idx, 
-                'val':0, 
-                'parent':None, 
-                'move':None, 
-                'depth':0, 
-                'cost':0, 
-                'algo':self.heuristic(self.start_grid),
-                'prev': None
-            })
+    def solve_parallel_a_star(self):
+        # Hash-distributed A* over worker processes, see parallel_astar.py
+        print(f"Solving using Hash-Distributed A* Search ({self.workers} workers)")
+        path, status, totals = parallel_astar.solve(self, self.workers)
+        self.nodes_popped = totals["nodes_popped"]
+        self.nodes_expanded = totals["nodes_expanded"]
+        self.nodes_generated = totals["nodes_generated"]
+        self.max_fringe_size = totals["max_fringe_size"]
+        self.per_worker_expanded = totals["per_worker_expanded"]
+        print(f"Expanded per worker: {self.per_worker_expanded}")
+        if status:
+            self.status = status
         final_state=None
-        
-        while len(fringe)>0:
+        if path:
+            current = self.get_start_node()
+            for key, val, move in path[1:]:
+                current = self.get_temp_node(current, key, self.decode(key).index(0), val, move)
+            final_state=current
+        self.generate_results(final_state)
 
+    def join_paths(self, forward, backward):
+        # Replays the backward half of a bidirectional path as forward moves. backward was
+        # made from backward.pred by sliding tile backward.val, so the forward move slides
+        # the same tile back the opposite way.
+        current = forward
+        while backward.pred is not None:
+            pred = backward.pred
+            current = self.get_temp_node(current, pred.state, pred.blank, backward.val, OPPOSITE[backward.move])
+            backward = pred
+        return current
+
+    def solve_bidirectional(self):
+        print("Solving using Bidirectional Uniform Cost Search")
+        start = self.get_start_node()
+        goal_blank = self.goal_grid.index(0)
+        goal = Node(self.goal_key, goal_blank, 0, None, 0, 0, 0, 0, None)
+        # Moves are reversible at the same cost, so the backward search is a UCS from the
+        # goal whose g(n) is the cost from n to the goal
+        sides = [
+            (Frontier(lambda x: x.cost, self.closed_keys), {start.state: start}, "forward"),
+            (Frontier(lambda x: x.cost, set()), {goal.state: goal}, "backward"),
+        ]
+        self.track(sides[0][0], sides[1][0])
+        sides[0][0].append(start)
+        sides[1][0].append(goal)
+        self.nodes_generated+=1
+        best_cost = float("inf")
+        meet = None
+        if start.state == goal.state:
+            best_cost, meet = 0, (start, goal)
+
+        while len(sides[0][0]) > 0 and len(sides[1][0]) > 0:
+            # No path through an unexpanded node can beat best_cost once the two
+            # smallest g(n) values add up to it
+            if sides[0][0].min_priority() + sides[1][0].min_priority() >= best_cost:
+                break
+            index = 0 if len(sides[0][0]) <= len(sides[1][0]) else 1
+            fringe, reached, name = sides[index]
+            other = sides[1 - index][1]
+            current = fringe.pop()
             self.nodes_popped+=1
-            current = fringe[0]
-            if self.dump_flag:
-                successor_str = self.get_successors(current, prev)
-                self.write_log(f"Generating successors to {successor_str}")
-                prev = successor_str
-            if current['node']==self.goal_grid:
-                self.closed_steps.append(
-                    {
-                        'node': current['node'], 
-                        'ind':current['ind'], 
-                        'val':current['val'], 
-                        'parent':current['parent'], 
-                        'move':current['move'], 
-                        'depth':current['depth'], 
-                        'cost':current['cost'], 
-                        'algo':current['algo']
-                    })
-                self.log_successors(res)
-                final_state=copy.deepcopy(current)
+            self.check_budget()
+            fringe.closed.add(current.state)
+            if self.trace_steps:
+                self.write_log(f"Generating {name} successors to {self.get_successors(current)}")
+
+            children = []
+            res = self.neighbors(current, children)
+            for child in children:
+                if fringe.append(child):
+                    reached[child.state] = child
+                match = other.get(child.state)
+                if match is not None and child.cost + match.cost < best_cost:
+                    best_cost = child.cost + match.cost
+                    meet = (child, match) if index == 0 else (match, child)
+            self.max_fringe_size=max(self.max_fringe_size, len(sides[0][0]) + len(sides[1][0]))
+            self.log_successors(res)
+
+        final_state=None
+        if meet:
+            final_state = self.join_paths(meet[0], meet[1])
+        self.generate_results(final_state)
+
+    def expand_on_path(self, current, path_keys, pending):
+        # Children of current that are not already on the search path; DFS-style methods
+        # keep only the path and its siblings, so memory stays linear in the depth
+        if self.trace_steps:
+            self.write_log(f"Generating successors to {self.get_successors(current)}")
+        children = []
+        res = self.neighbors(current, children)
+        self.log_successors(res)
+        children = [c for c in children if c.state not in path_keys]
+        self.max_fringe_size = max(self.max_fringe_size, pending + len(children))
+        return children
+
+    def ida_search(self, current, bound, path_keys, pending):
+        self.nodes_popped+=1
+        self.check_budget()
+        if current.algo > bound:
+            return None, current.algo
+        if current.state == self.goal_key:
+            return current, bound
+        children = self.expand_on_path(current, path_keys, pending)
+        children.sort(key=lambda x: x.algo)
+        minimum = float("inf")
+        for i, child in enumerate(children):
+            path_keys.add(child.state)
+            found, limit = self.ida_search(child, bound, path_keys, pending + len(children) - i - 1)
+            path_keys.discard(child.state)
+            if found:
+                return found, limit
+            minimum = min(minimum, limit)
+        return None, minimum
+
+    def solve_ida_star(self):
+        print("Solving using Iterative Deepening A* Search")
+        start = self.get_start_node()
+        bound = start.algo
+        final_state=None
+        while True:
+            self.iterations+=1
+            self.write_log(f"Iteration {self.iterations}: f(n) limit = {bound}")
+            expanded = self.nodes_expanded
+            found, bound = self.ida_search(start, bound, {start.state}, 0)
+            if found or bound == float("inf"):
+                final_state=found
                 break
-            elif self.is_closed(current): 
-                self.max_fringe_size=max(self.max_fringe_size, len(fringe))
-                self.log_no_successors(fringe[0]['node'])
-                self.log_fringe(fringe)
-                del fringe[0]
-                
-            else:  
-                self.closed_steps.append(
-                    {
-                        'node': current['node'], 
-                        'ind':current['ind'], 
-                        'val':current['val'], 
-                        'parent':current['parent'], 
-                        'move':current['move'], 
-                        'depth':current['depth'], 
-                        'cost':current['cost'], 
-                        'algo':current['algo']
-                    })
-                res = self.neighbors(current, fringe, prev )
-                del fringe[0]
-                self.max_fringe_size=max(self.max_fringe_size, len(fringe))
-                fringe = sorted(fringe, key=lambda x: x['algo'])
-                self.log_successors(res)
-                self.log_fringe(fringe)
+        # Every expansion before the last iteration is repeated work
+        self.nodes_reexpanded = expanded
         self.generate_results(final_state)
-        
-def main():
-    if len(sys.argv) < 3:
-        print("Usage: python3 expense_8_puzzle.py <start-file> <goal-file> <method> <dump-flag>")
-        return
 
-    start_file = sys.argv[1]
-    goal_file = sys.argv[2]
+    def rbfs(self, current, f_limit, path_keys, pending):
+        # current.algo holds the backed-up f(n) of current, which can be above g(n) + h(n)
+        self.nodes_popped+=1
+        self.check_budget()
+        if current.state == self.goal_key:
+            return current, current.algo
+        if current.algo > current.cost + current.h:
+            # Backed-up f(n) means this subtree was explored before and dropped
+            self.nodes_reexpanded+=1
+        children = self.expand_on_path(current, path_keys, pending)
+        if not children:
+            return None, float("inf")
+        for child in children:
+            child.algo = max(child.algo, current.algo)
+        while True:
+            children.sort(key=lambda x: x.algo)
+            best = children[0]
+            if best.algo > f_limit:
+                return None, best.algo
+            alternative = children[1].algo if len(children) > 1 else float("inf")
+            path_keys.add(best.state)
+            found, best.algo = self.rbfs(best, min(f_limit, alternative), path_keys, pending + len(children) - 1)
+            path_keys.discard(best.state)
+            if found:
+                return found, best.algo
+
+    def solve_rbfs(self):
+        print("Solving using Recursive Best-First Search")
+        start = self.get_start_node()
+        final_state, _ = self.rbfs(start, float("inf"), {start.state}, 0)
+        self.generate_results(final_state)
+
+    def solve_oracle(self):
+        # Follows the precomputed best move from every board, so no search is needed
+        print("Solving using the State-Space Oracle")
+        if self.board != 3:
+            # n! table entries: 1 MB for 3x3, but about 60 TB for the 15-puzzle
+            print("The oracle method is only available for 3x3 boards")
+            self.status = "unsupported"
+            self.generate_results(None)
+            return
+        cache_key = (tuple(self.goal_grid), self.oracle_dir)
+        if cache_key not in Puzzle.oracles:
+            Puzzle.oracles[cache_key] = oracle.load_oracle(self.goal_grid, self.board, self.oracle_dir)
+        table = Puzzle.oracles[cache_key]
+        final_state=None
+        board = self.start_grid[:]
+        current = self.get_start_node()
+        self.nodes_popped+=1
+        if table.cost(board) != oracle.UNREACHED:
+            while current.state != self.goal_key:
+                b = current.blank
+                t = table.next_cell(board)
+                val = board[t]
+                move = next(m for cell, m in self.moves[b] if cell == t)
+                board[b], board[t] = val, 0
+                current = self.get_temp_node(current, self.encode(board), t, val, move)
+                self.nodes_expanded+=1
+                self.nodes_generated+=1
+                self.nodes_popped+=1
+            final_state=current
+        self.generate_results(final_state)
+
+def main():
+    parser = argparse.ArgumentParser(usage="python3 expense_8_puzzle.py <start-file> <goal-file> <method> <dump-flag> [options]")
+    parser.add_argument("start_file")
+    parser.add_argument("goal_file")
+    parser.add_argument("method", nargs="?", default="A*")
+    parser.add_argument("dump_flag", nargs="?", default=None)
+    parser.add_argument("--heuristic", type=heuristics.heuristic_argument, default="manhattan",
+                        help=f"heuristic of the informed methods: {', '.join(heuristics.HEURISTICS)}, or several separated by commas for their maximum")
+    parser.add_argument("--weight", type=float, default=2.0, help="heuristic weight w >= 1 of wa* and awa*")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes of hda* (default: number of CPUs)")
+    parser.add_argument("--checkpoint", default=None, metavar="FILE", help="snapshot the search to FILE periodically and when a budget runs out")
+    parser.add_argument("--checkpoint-every", type=float, default=60.0, help="seconds between checkpoints")
+    parser.add_argument("--resume", action="store_true", help="continue the search saved in the --checkpoint file")
+    parser.add_argument("--pdb-dir", default=".", help="directory holding the pattern database files")
+    parser.add_argument("--oracle-dir", default=".", help="directory holding the oracle table for the ORACLE method")
+    parser.add_argument("--node-limit", type=int, default=None, help="stop after this many expanded nodes")
+    parser.add_argument("--time-limit", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--trace-level", choices=TRACE_LEVELS, default="full", help="detail written to the trace when dump-flag is true")
+    parser.add_argument("--trace-every", type=int, default=1, help="write full closed/fringe snapshots every N expansions")
+    parser.add_argument("--trace-gzip", action="store_true", help="gzip the trace file")
+    parser.add_argument("--trace-file", default=None, help="trace file name (default trace-<date>-<time>.txt)")
+    parser.add_argument("--metrics", default=None, metavar="FILE", help="time the search phases and write a JSON summary to FILE")
+    parser.add_argument("--metrics-every", type=int, default=1000, help="sample fringe and closed sizes every N pops")
+    parser.add_argument("--progress", action="store_true", help="print every sample to stderr while searching")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="FILE", help="run the search under cProfile, optionally saving the stats to FILE")
+    parser.add_argument("--profile-memory", action="store_true", help="run the search under tracemalloc")
+    args = parser.parse_args()
 
     method = "A*"  # Default method is A* Search
     dump_flag = False  # Default dump_flag is False
 
-    if len(sys.argv) >= 4:
-        if sys.argv[3].upper() in ("BFS","UCS","GREEDY"):
-            method = sys.argv[3].upper()
-        if sys.argv[3].lower() in ("true", "false"):
-            dump_flag = sys.argv[3].lower() == "true"
-    if len(sys.argv) >= 5:
-        dump_flag = sys.argv[4].lower() == "true"
+    if args.method.upper() in METHODS:
+        method = args.method.upper()
+    if args.method.lower() in ("true", "false"):
+        dump_flag = args.method.lower() == "true"
+    if args.dump_flag is not None:
+        dump_flag = args.dump_flag.lower() == "true"
+
+    metrics = None
+    if args.metrics or args.progress or args.profile is not None or args.profile_memory:
+        progress = None
+        if args.progress:
+            progress = lambda p: print(f"{p['seconds']:.2f}s popped {p['popped']} expanded {p['expanded']} fringe {p['fringe']} closed {p['closed']}", file=sys.stderr)
+        metrics = SearchMetrics(args.metrics_every, progress, args.profile is not None, args.profile or None, args.profile_memory)
 
-    puzzle_instance = Puzzle(start_file, goal_file, method, dump_flag)
+    puzzle_instance = Puzzle(args.start_file, args.goal_file, method, dump_flag, args.heuristic, args.pdb_dir, args.oracle_dir,
+                             node_limit=args.node_limit, time_limit=args.time_limit,
+                             trace_level=args.trace_level, trace_gzip=args.trace_gzip, trace_every=args.trace_every, trace_file=args.trace_file,
+                             metrics=metrics, weight=args.weight, workers=args.workers,
+                             checkpoint_file=args.checkpoint, checkpoint_every=args.checkpoint_every, resume=args.resume)
+    if args.checkpoint:
+        # Ctrl-C stops the search at the next budget check and writes a last checkpoint
+        signal.signal(signal.SIGINT, lambda number, frame: setattr(puzzle_instance, "interrupted", True))
 
     print(f"Start File: {puzzle_instance.start_file}")
     print(f"Goal File: {puzzle_instance.goal_file}")
     print(f"Method: {puzzle_instance.method}")
     print(f"Dump Flag: {puzzle_instance.dump_flag}")
 
-    if puzzle_instance.method == "BFS":
-        puzzle_instance.solve_bfs()
-    elif puzzle_instance.method == "UCS":
-        puzzle_instance.solve_ucs()
-    elif puzzle_instance.method == "GREEDY":
-        puzzle_instance.solve_greedy()
-    else:
-        puzzle_instance.solve_a_star()
+    puzzle_instance.solve()
+    if metrics:
+        print(metrics.report())
+        if args.metrics:
+            with open(args.metrics, "w") as f:
+                json.dump(puzzle_instance.summary(), f, indent=1)
+    if puzzle_instance.status == "unsolvable":
+        sys.exit(3)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,103 @@
+import sys
+import time
+import random
+import argparse
+
+import oracle
+from benchmark import random_walk, run_quiet
+from boards import read_grid
+from expense_8_puzzle import Puzzle
+from heuristics import heuristic_argument
+
+def check_admissible(puzzles, table, goal_grid, board, samples, rng, max_walk):
+    # h(n) <= optimal cost for every sampled board, and |h(n) - h(m)| <= moved tile
+    # for each of its moves (consistency). Returns the number of violations.
+    violations = 0
+    for _ in range(samples):
+        grid = random_walk(goal_grid, board, rng.randint(0, max_walk), rng)
+        optimal = table.cost(grid)
+        for name, puzzle in puzzles.items():
+            puzzle.start_grid = grid
+            node = puzzle.get_start_node()
+            if node.h > optimal:
+                violations += 1
+                print(f"{name}: h = {node.h} > optimal {optimal} for {grid}")
+            for t, move in puzzle.moves[node.blank]:
+                val = grid[t]
+                key = node.state + (val << (puzzle.bits * node.blank)) - (val << (puzzle.bits * t))
+                child = puzzle.get_temp_node(node, key, t, val, move)
+                if abs(child.h - node.h) > val:
+                    violations += 1
+                    print(f"{name}: moving {val} changes h from {node.h} to {child.h} for {grid}")
+    return violations
+
+def compare_expansions(names, goal_grid, board, instances, rng, max_walk, args, table):
+    # A* with every heuristic on the same random instances. Instances that some heuristic
+    # does not finish within --time-limit are left out of the totals; returns the totals
+    # and the number left out.
+    totals = {name: {"expanded": 0, "seconds": 0.0, "wrong": 0} for name in names}
+    skipped = 0
+    for _ in range(instances):
+        start = random_walk(goal_grid, board, rng.randint(1, max_walk), rng)
+        puzzles = {name: run_quiet(Puzzle("start", "goal", "A*", False, name, args.pdb_dir, args.oracle_dir,
+                                          start_grid=start, goal_grid=goal_grid, time_limit=args.time_limit))
+                   for name in names}
+        if any(puzzle.status != "solved" for puzzle in puzzles.values()):
+            skipped += 1
+            continue
+        # Without an oracle the heuristics can only be checked against each other
+        optimal = table.cost(start) if table else min(p.final_state.cost for p in puzzles.values())
+        for name, puzzle in puzzles.items():
+            totals[name]["expanded"] += puzzle.nodes_expanded
+            totals[name]["seconds"] += puzzle.elapsed
+            if puzzle.final_state.cost != optimal:
+                totals[name]["wrong"] += 1
+                print(f"{name}: A* cost {puzzle.final_state.cost}, optimal {optimal} for {start}")
+    return totals, skipped
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks heuristics against the oracle and compares their A* expansions.")
+    parser.add_argument("goal_file")
+    parser.add_argument("--heuristics", type=lambda text: [heuristic_argument(part) for part in text.split(";")],
+                        default=["manhattan", "linear-conflict"],
+                        help="heuristics separated by ';', the first is the reference (default manhattan;linear-conflict)")
+    parser.add_argument("--samples", type=int, default=20000, help="random boards checked against the oracle")
+    parser.add_argument("--instances", type=int, default=200, help="random instances solved with A*")
+    parser.add_argument("--max-walk", type=int, default=80)
+    parser.add_argument("--seed", type=int, default=2023)
+    parser.add_argument("--time-limit", type=float, default=60)
+    parser.add_argument("--pdb-dir", default=".")
+    parser.add_argument("--oracle-dir", default=".")
+    args = parser.parse_args()
+
+    goal_grid = read_grid(args.goal_file)
+    board = int(round(len(goal_grid) ** 0.5))
+    rng = random.Random(args.seed)
+    # The oracle enumerates every board, which is only practical up to 3x3
+    table = oracle.load_oracle(goal_grid, board, args.oracle_dir) if board <= 3 else None
+    violations = 0
+    if table:
+        puzzles = {name: Puzzle("start", "goal", "A*", False, name, args.pdb_dir, args.oracle_dir,
+                                start_grid=goal_grid, goal_grid=goal_grid)
+                   for name in args.heuristics}
+        started = time.perf_counter()
+        violations = check_admissible(puzzles, table, goal_grid, board, args.samples, rng, args.max_walk)
+        print(f"Admissibility: {args.samples} boards and their moves, {violations} violations ({time.perf_counter() - started:.1f}s)")
+    else:
+        print("Admissibility: no oracle for boards wider than 3, A* costs are compared between the heuristics only")
+
+    totals, skipped = compare_expansions(args.heuristics, goal_grid, board, args.instances, rng, args.max_walk, args, table)
+    reference = totals[args.heuristics[0]]
+    print(f"A* on {args.instances - skipped} instances ({skipped} not finished within the time limit):")
+    print(f"{'heuristic':<28}{'expanded':>12}{'reduction':>11}{'seconds':>10}{'speedup':>9}{'wrong':>7}")
+    for name in args.heuristics:
+        row = totals[name]
+        reduction = 1 - row["expanded"] / reference["expanded"] if reference["expanded"] else 0.0
+        speedup = reference["seconds"] / row["seconds"] if row["seconds"] > 0 else 0.0
+        print(f"{name:<28}{row['expanded']:>12}{reduction:>10.1%}{row['seconds']:>10.2f}{speedup:>8.2f}x{row['wrong']:>7}")
+        violations += row["wrong"]
+    if violations:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import argparse
+
+from boards import encode, decode
+
+# The heuristics keep copies of the Puzzle fields they need rather than the Puzzle itself,
+# so a finished Puzzle and its closed set are freed as soon as it is dropped
+
+# LinearConflict keeps at most LINE_CACHE_SIZE costs per row or column, which holds every
+# 4x4 line (16*15*14*13 contents) but not the 6.4M of a 5x5 one, and the tables of the
+# GOAL_TABLES goals used last
+LINE_CACHE_SIZE = 1 << 16
+GOAL_TABLES = 4
+
+class Manhattan:
+    # Sum over the tiles of tile * Manhattan distance to the tile's goal cell
+    def __init__(self, puzzle):
+        self.table = puzzle.h_table
+
+    def value(self, grid):
+        table = self.table
+        heu = 0
+        for pos, tile in enumerate(grid):
+            heu += table[tile][pos]
+        return heu
+
+    def child(self, parent, key, ind, val):
+        # Only the moved tile changes position, from ind to the parent's blank cell
+        table = self.table[val]
+        return parent.h - table[ind] + table[parent.blank]
+
+class LinearConflict:
+    # Weighted Manhattan plus the linear conflicts of every row and column. Tiles in their
+    # goal line keep their order while they stay in it, so the tiles that never leave form
+    # an increasing subsequence of goal positions; every other tile steps out and back in,
+    # two moves across the line that the Manhattan distance does not count. Charging the
+    # cheapest such set is 2 * (weight of the line's goal tiles - heaviest increasing
+    # subsequence). Row conflicts add vertical moves and column conflicts horizontal ones,
+    # so both sums can be added. One move changes h by at most the moved tile's cost,
+    # so the heuristic stays consistent.
+    # Rows are cached by their packed bits, columns by their tiles from top to bottom.
+    tables = {}
+
+    def __init__(self, puzzle):
+        self.manhattan = Manhattan(puzzle)
+        board = puzzle.board
+        self.board = board
+        self.bits = puzzle.bits
+        self.mask = puzzle.mask
+        self.row_mask = (1 << (puzzle.bits * board)) - 1
+        # Lines 0..board-1 are the rows, board..2*board-1 the columns; line_shifts holds the
+        # bit offsets of their cells in the packed key
+        self.line_cells = [tuple(r * board + c for c in range(board)) for r in range(board)]
+        self.line_cells += [tuple(r * board + c for r in range(board)) for c in range(board)]
+        self.line_shifts = [tuple(puzzle.bits * cell for cell in cells) for cells in self.line_cells]
+        # goal_line[line][tile] is the tile's place in that line of the goal, or None when
+        # the tile's goal cell is elsewhere; goal_row and goal_col hold the row and column of it
+        self.goal_line = [[None] * (board * board) for _ in range(2 * board)]
+        self.goal_row = [None] * (board * board)
+        self.goal_col = [None] * (board * board)
+        for pos, tile in enumerate(puzzle.goal_grid):
+            if tile:
+                row, col = divmod(pos, board)
+                self.goal_line[row][tile] = col
+                self.goal_line[board + col][tile] = row
+                self.goal_row[tile] = row
+                self.goal_col[tile] = col
+        # Conflict costs by line contents, shared by every instance with this goal
+        goal = tuple(puzzle.goal_grid)
+        tables = LinearConflict.tables
+        cache = tables.pop(goal, None)
+        if cache is None:
+            cache = [{} for _ in range(2 * board)]
+            if len(tables) >= GOAL_TABLES:
+                del tables[next(iter(tables))]
+        # Re-inserted so the dictionary stays ordered from least to most recently used
+        tables[goal] = self.cache = cache
+
+    def conflict(self, line, tiles):
+        places = self.goal_line[line]
+        weights, order = [], []
+        for tile in tiles:
+            if places[tile] is not None:
+                weights.append(tile)
+                order.append(places[tile])
+        # Heaviest subsequence whose goal places increase
+        heaviest = []
+        for i, weight in enumerate(weights):
+            heaviest.append(weight + max((heaviest[j] for j in range(i) if order[j] < order[i]), default=0))
+        return 2 * (sum(weights) - max(heaviest, default=0))
+
+    def line_cost(self, key, line):
+        mask = self.mask
+        shifts = self.line_shifts[line]
+        if line < self.board:
+            contents = (key >> shifts[0]) & self.row_mask
+        else:
+            contents = tuple((key >> shift) & mask for shift in shifts)
+        cache = self.cache[line]
+        cost = cache.get(contents)
+        if cost is None:
+            cost = self.conflict(line, [(key >> shift) & mask for shift in shifts])
+            if len(cache) < LINE_CACHE_SIZE:
+                cache[contents] = cost
+        return cost
+
+    def value(self, grid):
+        key = encode(grid, self.bits)
+        return self.manhattan.value(grid) + sum(self.line_cost(key, line) for line in range(2 * self.board))
+
+    def child(self, parent, key, ind, val):
+        # A move keeps the order of the tiles along its own direction, so it can only
+        # change the conflicts of the moved tile's goal row (vertical move) or goal column
+        # (horizontal move), and only when the tile enters or leaves that line
+        heu = self.manhattan.child(parent, key, ind, val)
+        board = self.board
+        to = parent.blank
+        if ind - to in (1, -1):
+            line = self.goal_col[val]
+            if line != ind % board and line != to % board:
+                return heu
+            line += board
+        else:
+            line = self.goal_row[val]
+            if line != ind // board and line != to // board:
+                return heu
+        return heu + self.line_cost(key, line) - self.line_cost(parent.state, line)
+
+class PatternDatabase:
+    # Sum of the additive pattern databases; each one only charges its own tiles
+    def __init__(self, puzzle):
+        self.pdbs = puzzle.pdbs
+        self.layout = (puzzle.bits, len(puzzle.goal_grid))
+
+    def value(self, grid):
+        where = [0] * len(grid)
+        for pos, tile in enumerate(grid):
+            where[tile] = pos
+        heu = 0
+        for db in self.pdbs:
+            heu += db.lookup(where)
+        return heu
+
+    def child(self, parent, key, ind, val):
+        return self.value(decode(key, *self.layout))
+
+class Maximum:
+    # The largest of several admissible heuristics, which is admissible too. The parts
+    # are recomputed for every node since the parent's h(n) is only their maximum.
+    def __init__(self, parts, layout):
+        self.parts = parts
+        self.layout = layout
+
+    def value(self, grid):
+        return max(part.value(grid) for part in self.parts)
+
+    def child(self, parent, key, ind, val):
+        return self.value(decode(key, *self.layout))
+
+HEURISTICS = {
+    "manhattan": Manhattan,
+    "linear-conflict": LinearConflict,
+    "pdb": PatternDatabase,
+}
+
+def parse_names(spec):
+    # "pdb,linear-conflict" -> ["pdb", "linear-conflict"]; several names mean their maximum
+    names = [name.strip().lower() for name in spec.split(",") if name.strip()]
+    if not names:
+        raise ValueError("no heuristic given")
+    for name in names:
+        if name not in HEURISTICS:
+            raise ValueError(f"unknown heuristic {name!r}, expected one of {', '.join(HEURISTICS)}")
+    return names
+
+def heuristic_argument(spec):
+    # argparse type for --heuristic options
+    try:
+        return ",".join(parse_names(spec))
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def make_heuristic(puzzle, names):
+    parts = [HEURISTICS[name](puzzle) for name in names]
+    if len(parts) == 1:
+        return parts[0]
+    return Maximum(parts, (puzzle.bits, len(puzzle.goal_grid)))
@@ -0,0 +1,146 @@
+import sys
+
+from boards import adjacent_cells, cell_bits, encode, manhattan_table, read_grid
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def supports(board):
+    # Boards are packed cell_bits() per cell, as in Puzzle.encode, into one uint64
+    return board * board * cell_bits(board * board) <= 64
+
+def require_numpy():
+    if np is None:
+        raise ImportError("the layered BFS engine needs numpy (pip install numpy)")
+
+class LayeredBFS:
+    # Breadth-first search one whole layer at a time. A layer is a sorted uint64 array of
+    # packed boards (the same keys as Puzzle.encode), so boards up to 4x4 fit. Every blank position and direction is handled as one array operation.
+    # A move always changes the blank's colour on a chessboard colouring of the cells,
+    # so the state graph is bipartite: the children of layer d lie in layer d - 1 or
+    # d + 1, and removing layer d - 1 is the whole duplicate check.
+    def __init__(self, goal_grid, board):
+        require_numpy()
+        if not supports(board):
+            raise ValueError("the layered BFS engine packs boards into 64 bits and supports up to 4x4")
+        self.board = board
+        self.size = board * board
+        self.goal_grid = list(goal_grid)
+        # cells[b] are the cells whose tile can slide into a blank at b
+        self.cells = adjacent_cells(board)
+        self.bits = cell_bits(self.size)
+        self.mask = np.uint64((1 << self.bits) - 1)
+        self.shifts = np.arange(self.size, dtype=np.uint64) * np.uint64(self.bits)
+        # Weighted Manhattan distance table, indexed [tile, cell]
+        self.h_table = np.array(manhattan_table(self.goal_grid, board), dtype=np.int64)
+
+    def encode(self, grid):
+        return encode(grid, self.bits)
+
+    def tiles(self, keys):
+        # (len(keys), size) array of the tile on every cell
+        return ((keys[:, None] >> self.shifts) & self.mask).astype(np.intp)
+
+    def heuristics(self, keys):
+        # Weighted Manhattan distance of every board in keys at once
+        return self.h_table[self.tiles(keys), np.arange(self.size)].sum(axis=1)
+
+    def expand(self, keys, blanks):
+        # All successors of a layer: returns (children, child blanks, parent index)
+        children, child_blanks, parents = [], [], []
+        index = np.arange(len(keys))
+        for b in range(self.size):
+            at = blanks == b
+            if not at.any():
+                continue
+            parent_keys = keys[at]
+            parent_index = index[at]
+            for t in self.cells[b]:
+                val = (parent_keys >> self.shifts[t]) & self.mask
+                # The tile at t slides into the blank at b; unsigned wrap-around cancels out
+                children.append(parent_keys + (val << self.shifts[b]) - (val << self.shifts[t]))
+                child_blanks.append(np.full(len(parent_keys), t, dtype=np.intp))
+                parents.append(parent_index)
+        if not children:
+            empty = np.zeros(0, dtype=np.intp)
+            return np.zeros(0, dtype=np.uint64), empty, empty
+        return np.concatenate(children), np.concatenate(child_blanks), np.concatenate(parents)
+
+    def layers(self, start_grid):
+        # Yields (depth, keys, blanks, parents, generated) for every layer, starting with
+        # the start board. parents[i] indexes the previous layer; generated counts the
+        # successors made before duplicates were removed.
+        keys = np.array([self.encode(start_grid)], dtype=np.uint64)
+        blanks = np.array([start_grid.index(0)], dtype=np.intp)
+        previous = np.zeros(0, dtype=np.uint64)
+        depth = 0
+        yield depth, keys, blanks, np.zeros(1, dtype=np.intp), 1
+        while len(keys):
+            children, child_blanks, parents = self.expand(keys, blanks)
+            generated = len(children)
+            # np.unique sorts and keeps the first copy of each board
+            unique, first = np.unique(children, return_index=True)
+            fresh = ~np.isin(unique, previous, assume_unique=True)
+            first = first[fresh]
+            previous, keys = keys, unique[fresh]
+            blanks, parents = child_blanks[first], parents[first]
+            depth += 1
+            yield depth, keys, blanks, parents, generated
+
+    def search(self, start_grid, on_layer = None):
+        # Returns (path, expanded, generated) where path lists the packed boards of a
+        # fewest-moves path from start to goal, or is None. on_layer(expanded, layer_size)
+        # is called before every layer is expanded and may raise to stop the search.
+        goal = np.uint64(self.encode(self.goal_grid))
+        history = []
+        expanded, generated = 0, 0
+        for depth, keys, blanks, parents, made in self.layers(start_grid):
+            generated += made
+            history.append((keys, parents))
+            found = int(np.searchsorted(keys, goal))
+            if found < len(keys) and keys[found] == goal:
+                return self.backtrack(history, found), expanded, generated
+            if on_layer:
+                on_layer(expanded, len(keys))
+            expanded += len(keys)
+        return None, expanded, generated
+
+    def backtrack(self, history, index):
+        # Follows the parent indexes from the goal's layer back to the start
+        path = []
+        for keys, parents in reversed(history):
+            path.append(int(keys[index]))
+            index = int(parents[index])
+        path.reverse()
+        return path
+
+def profile(goal_grid, board, max_depth = None):
+    # Full sweep from the goal: (depth, boards, mean and max weighted Manhattan) per layer.
+    # Moves are reversible, so this is also the fewest-moves distance of every board.
+    engine = LayeredBFS(goal_grid, board)
+    rows = []
+    for depth, keys, _, _, _ in engine.layers(goal_grid):
+        if not len(keys) or (max_depth is not None and depth > max_depth):
+            break
+        h = engine.heuristics(keys)
+        rows.append((depth, len(keys), float(h.mean()), int(h.max())))
+    return rows
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 layered.py <goal-file> [<max-depth>]")
+        return
+    goal_grid = read_grid(sys.argv[1])
+    board = int(round(len(goal_grid) ** 0.5))
+    max_depth = int(sys.argv[2]) if len(sys.argv) >= 3 else None
+    total = 0
+    print("depth    boards   mean h   max h")
+    for depth, count, mean_h, max_h in profile(goal_grid, board, max_depth):
+        total += count
+        print(f"{depth:>5} {count:>9} {mean_h:>8.1f} {max_h:>7}")
+    print(f"{total} boards")
+
+if __name__ == "__main__":
+    main()
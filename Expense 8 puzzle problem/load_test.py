@@ -0,0 +1,119 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+
+from benchmark import random_walk
+from boards import read_grid
+
+def make_requests(goal_grid, count, distinct, method, seed, max_walk):
+    # count requests drawn from 'distinct' random-walk boards, so repeats exercise the cache
+    board = int(round(len(goal_grid) ** 0.5))
+    rng = random.Random(seed)
+    boards = [random_walk(goal_grid, board, rng.randint(1, max_walk), rng) for _ in range(distinct)]
+    return [{"id": i, "start": rng.choice(boards), "goal": goal_grid, "method": method} for i in range(count)]
+
+async def open_connection(args):
+    if args.port is not None:
+        return await asyncio.open_connection("127.0.0.1", args.port)
+    return await asyncio.open_unix_connection(args.socket)
+
+async def client(args, queue, latencies, statuses):
+    reader, writer = await open_connection(args)
+    try:
+        while queue:
+            request = queue.pop()
+            started = time.perf_counter()
+            writer.write((json.dumps(request) + "\n").encode())
+            await writer.drain()
+            result = json.loads(await reader.readline())
+            latencies.append((time.perf_counter() - started, result.get("cached", False)))
+            key = "cached" if result.get("cached") else result["status"]
+            statuses[key] = statuses.get(key, 0) + 1
+    finally:
+        writer.close()
+
+async def stats(args):
+    reader, writer = await open_connection(args)
+    writer.write(b'{"op": "stats"}\n')
+    await writer.drain()
+    result = json.loads(await reader.readline())
+    writer.close()
+    return result
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+async def run(args, requests):
+    latencies, statuses = [], {}
+    queue = list(reversed(requests))
+    started = time.perf_counter()
+    await asyncio.gather(*(client(args, queue, latencies, statuses) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    print(f"{len(latencies)} requests in {elapsed:.2f}s over {args.concurrency} connections: {len(latencies) / elapsed:.0f} requests/s")
+    print(f"Results: {statuses}")
+    for label, rows in (("all", [l for l, _ in latencies]), ("cached", [l for l, c in latencies if c]),
+                        ("searched", [l for l, c in latencies if not c])):
+        if rows:
+            print(f"Latency {label:<8} p50 {percentile(rows, 0.5) * 1000:8.2f} ms   p95 {percentile(rows, 0.95) * 1000:8.2f} ms   p99 {percentile(rows, 0.99) * 1000:8.2f} ms")
+    print(f"Service: {json.dumps(await stats(args))}")
+
+def wait_for_service(args, process):
+    # The spawned service needs a moment to start its workers and open the socket
+    for _ in range(200):
+        if process.poll() is not None:
+            raise RuntimeError("solver service exited during start-up")
+        if args.port is None and os.path.exists(args.socket):
+            return
+        if args.port is not None:
+            try:
+                asyncio.run(stats(args))
+                return
+            except OSError:
+                pass
+        time.sleep(0.05)
+    raise RuntimeError("solver service did not start")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for solver_service.py.")
+    parser.add_argument("goal_file")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=200, help="different start boards among the requests")
+    parser.add_argument("--concurrency", type=int, default=16, help="simultaneous connections")
+    parser.add_argument("--method", default="A*")
+    parser.add_argument("--seed", type=int, default=2023)
+    parser.add_argument("--max-walk", type=int, default=60)
+    parser.add_argument("--socket", default="expense_8_puzzle.sock")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--spawn", action="store_true", help="start a service for the test and stop it afterwards")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="workers of the spawned service")
+    parser.add_argument("--cache-size", type=int, default=10000, help="cache size of the spawned service")
+    args = parser.parse_args()
+
+    goal_grid = read_grid(args.goal_file)
+    requests = make_requests(goal_grid, args.requests, args.distinct, args.method, args.seed, args.max_walk)
+    process = None
+    if args.spawn:
+        command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "solver_service.py"),
+                   "--goal-file", args.goal_file, "--workers", str(args.workers), "--cache-size", str(args.cache_size)]
+        command += ["--port", str(args.port)] if args.port is not None else ["--socket", args.socket]
+        if args.port is None and os.path.exists(args.socket):
+            os.unlink(args.socket)
+        process = subprocess.Popen(command)
+        wait_for_service(args, process)
+    try:
+        asyncio.run(run(args, requests))
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import io
+import time
+import pstats
+import cProfile
+import tracemalloc
+from collections import deque
+
+PHASES = ("expansion", "heuristic", "duplicate", "frontier", "tracing")
+
+class TimedDeque(deque):
+    # A plain deque cannot have its methods replaced per instance; this subclass can
+    pass
+
+class SearchMetrics:
+    # Opt-in instrumentation for Puzzle. attach() swaps the hot-path methods of one Puzzle
+    # instance for timed wrappers, so a Puzzle without metrics runs the plain methods and
+    # pays nothing. Phase times are exclusive: time spent in a nested timed call (for
+    # example the heuristic inside an expansion) is only counted once, in the inner phase.
+    def __init__(self, every = 1000, progress = None, profile = False, profile_file = None, memory = False, top = 15):
+        self.every = max(1, every)
+        self.progress = progress
+        self.profile = profile or profile_file is not None
+        self.profile_file = profile_file
+        self.memory = memory
+        self.top = top
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.calls = dict.fromkeys(PHASES, 0)
+        self.samples = []
+        self.stack = []
+        self.profile_rows = []
+        self.memory_peak = None
+        self.memory_rows = []
+        self.puzzle = None
+        self.started = None
+
+    def timed(self, phase, function):
+        seconds, calls, stack = self.seconds, self.calls, self.stack
+        clock = time.perf_counter
+
+        def wrapper(*args):
+            stack.append(0.0)
+            started = clock()
+            try:
+                return function(*args)
+            finally:
+                spent = clock() - started
+                seconds[phase] += spent - stack.pop()
+                calls[phase] += 1
+                if stack:
+                    stack[-1] += spent
+        return wrapper
+
+    def attach(self, puzzle):
+        self.puzzle = puzzle
+        # expand_on_path is left out: it calls neighbors, so every IDA*/RBFS expansion would count twice
+        phases = {
+            "expansion": ("neighbors",),
+            "duplicate": ("is_closed", "add_closed"),
+            "tracing": ("write_log", "log_successors", "log_no_successors", "log_fringe", "log_closed", "node_str"),
+        }
+        for phase, names in phases.items():
+            for name in names:
+                setattr(puzzle, name, self.timed(phase, getattr(puzzle, name)))
+        # Only the h(n) computation itself, not building the child node around it. The inlined
+        # Manhattan update in get_temp_node is switched off so that it goes through
+        # Manhattan.child, which gives the same h(n), and is timed like the others.
+        h_function = puzzle.h_function
+        h_function.value = self.timed("heuristic", h_function.value)
+        h_function.child = self.timed("heuristic", h_function.child)
+        puzzle.h_inline = False
+        check_budget = puzzle.check_budget
+
+        def sampled_check_budget():
+            check_budget()
+            if puzzle.nodes_popped % self.every == 0:
+                self.sample()
+        puzzle.check_budget = sampled_check_budget
+
+    def queue(self):
+        # BFS fringe that track() can time
+        return TimedDeque()
+
+    def track(self, fringe):
+        # Frontier operations. The duplicate test inside Frontier.append is timed as its
+        # own phase; fringes that cannot take attributes are left untimed.
+        if not hasattr(fringe, "__dict__"):
+            return
+        for name in ("pop", "popleft", "min_priority"):
+            if hasattr(fringe, name):
+                setattr(fringe, name, self.timed("frontier", getattr(fringe, name)))
+        if hasattr(fringe, "is_duplicate"):
+            is_duplicate = self.timed("duplicate", fringe.is_duplicate)
+            push = self.timed("frontier", fringe.push)
+
+            def append(node):
+                if is_duplicate(node):
+                    return False
+                push(node)
+                return True
+            fringe.append = append
+        else:
+            fringe.append = self.timed("frontier", fringe.append)
+
+    def sample(self):
+        puzzle = self.puzzle
+        # The backward half of a bidirectional search keeps its own closed set
+        closed = {id(puzzle.closed_keys): puzzle.closed_keys}
+        for fringe in puzzle.open_lists:
+            if hasattr(fringe, "closed"):
+                closed[id(fringe.closed)] = fringe.closed
+        point = {
+            "seconds": round(time.perf_counter() - self.started, 6),
+            "popped": puzzle.nodes_popped,
+            "expanded": puzzle.nodes_expanded,
+            "generated": puzzle.nodes_generated,
+            "fringe": sum(len(f) for f in puzzle.open_lists),
+            "closed": sum(len(keys) for keys in closed.values()),
+        }
+        self.samples.append(point)
+        if self.progress:
+            self.progress(point)
+
+    def run(self, solver):
+        # Runs one solve_* call under the optional profilers
+        self.started = time.perf_counter()
+        profiler = cProfile.Profile() if self.profile else None
+        if self.memory:
+            tracemalloc.start()
+        try:
+            if profiler:
+                profiler.runcall(solver)
+            else:
+                solver()
+        finally:
+            if self.memory:
+                self.memory_peak = tracemalloc.get_traced_memory()[1]
+                stats = tracemalloc.take_snapshot().statistics("lineno")
+                self.memory_rows = [{"line": str(s.traceback), "bytes": s.size, "blocks": s.count} for s in stats[:self.top]]
+                tracemalloc.stop()
+            if profiler:
+                self.collect_profile(profiler)
+            if self.puzzle is not None and (not self.samples or self.samples[-1]["popped"] != self.puzzle.nodes_popped):
+                self.sample()
+
+    def collect_profile(self, profiler):
+        if self.profile_file:
+            profiler.dump_stats(self.profile_file)
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        for (file_name, line, function), (_, calls, tottime, cumtime, _) in sorted(
+                stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]:
+            self.profile_rows.append({
+                "function": f"{file_name}:{line}({function})",
+                "calls": calls,
+                "tottime": round(tottime, 6),
+                "cumtime": round(cumtime, 6),
+            })
+
+    def summary(self):
+        result = {
+            "phases": {p: {"seconds": round(self.seconds[p], 6), "calls": self.calls[p]} for p in PHASES},
+            "sample_every": self.every,
+            "samples": self.samples,
+        }
+        if self.profile_rows:
+            result["profile"] = self.profile_rows
+        if self.memory_peak is not None:
+            result["memory_peak_bytes"] = self.memory_peak
+            result["memory_top"] = self.memory_rows
+        return result
+
+    def report(self):
+        lines = ["Phase times:"]
+        for phase in PHASES:
+            lines.append(f"\t{phase:<10} {self.seconds[phase]:>9.4f}s {self.calls[phase]:>10} calls")
+        if self.memory_peak is not None:
+            lines.append(f"Peak traced memory: {self.memory_peak // 1024} KB")
+        if self.profile_rows:
+            lines.append("Top functions by own time:")
+            for row in self.profile_rows:
+                lines.append(f"\t{row['tottime']:>9.4f}s {row['calls']:>10}  {row['function']}")
+        return "\n".join(lines)
@@ -0,0 +1,134 @@
+import os
+import sys
+import mmap
+import heapq
+from array import array
+
+from boards import adjacent_cells, read_grid, write_atomic
+
+MAGIC = b"E8ORC1"
+UNREACHED = 0xFFFF
+NO_MOVE = 0xFF
+
+def perm_rank(board):
+    # Lehmer-code rank of the board among all n! permutations
+    rank = 0
+    size = len(board)
+    for i in range(size):
+        smaller = 0
+        for j in range(i + 1, size):
+            if board[j] < board[i]:
+                smaller += 1
+        rank = rank * (size - i) + smaller
+    return rank
+
+def factorial(n):
+    total = 1
+    for i in range(2, n + 1):
+        total *= i
+    return total
+
+def build_oracle(goal_grid, board):
+    # One backward Dijkstra from the goal over every reachable board. Moves are their own
+    # inverse at the same cost, so the distance to the goal equals the distance from it.
+    # costs[rank] is the optimal expense to the goal and moves[rank] the cell whose tile
+    # should slide into the blank next.
+    size = board * board
+    adjacent = adjacent_cells(board)
+    costs = array('H', [UNREACHED]) * factorial(size)
+    moves = array('B', [NO_MOVE]) * factorial(size)
+    goal = tuple(goal_grid)
+    best = {goal: (0, NO_MOVE)}
+    heap = [(0, goal)]
+    while heap:
+        cost, state = heapq.heappop(heap)
+        if best[state][0] < cost:
+            continue
+        rank = perm_rank(state)
+        costs[rank] = cost
+        moves[rank] = best[state][1]
+        blank = state.index(0)
+        for cell in adjacent[blank]:
+            tile = state[cell]
+            moved = list(state)
+            moved[blank], moved[cell] = tile, 0
+            moved = tuple(moved)
+            new_cost = cost + tile
+            # From the new board, sliding the tile now at 'blank' back undoes this move
+            if new_cost < best.get(moved, (UNREACHED,))[0]:
+                best[moved] = (new_cost, blank)
+                heapq.heappush(heap, (new_cost, moved))
+    return costs, moves
+
+def oracle_file_name(goal_grid):
+    return f"oracle-{''.join(format(t, 'x') for t in goal_grid)}.bin"
+
+def write_oracle(path, goal_grid, board, costs, moves):
+    header = MAGIC + bytes([board]) + bytes(goal_grid)
+    if len(header) % 2:
+        header += b"\0"
+    if sys.byteorder != "little":
+        costs = array('H', costs)
+        costs.byteswap()
+    write_atomic(path, (header, costs.tobytes(), moves.tobytes()))
+
+class Oracle:
+    # Memory-mapped optimal-cost and best-move tables for one goal
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an oracle file")
+        offset = len(MAGIC)
+        self.board = self.map[offset]
+        size = self.board * self.board
+        self.goal_grid = list(self.map[offset + 1:offset + 1 + size])
+        offset += 1 + size
+        offset += offset % 2
+        count = factorial(size)
+        view = memoryview(self.map)
+        if sys.byteorder == "little":
+            self.costs = view[offset:offset + 2 * count].cast('H')
+        else:
+            self.costs = array('H', view[offset:offset + 2 * count])
+            self.costs.byteswap()
+        self.moves = view[offset + 2 * count:offset + 3 * count]
+
+    def cost(self, board):
+        return self.costs[perm_rank(board)]
+
+    def next_cell(self, board):
+        return self.moves[perm_rank(board)]
+
+    def close(self):
+        if isinstance(self.costs, memoryview):
+            self.costs.release()
+        self.moves.release()
+        self.map.close()
+        self.file.close()
+
+def load_oracle(goal_grid, board, directory = "."):
+    # Memory-maps the table for this goal, building and writing it first if it is missing
+    path = os.path.join(directory, oracle_file_name(goal_grid))
+    if not os.path.exists(path):
+        costs, moves = build_oracle(goal_grid, board)
+        write_oracle(path, goal_grid, board, costs, moves)
+    return Oracle(path)
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 oracle.py <goal-file> [<output-dir>]")
+        return
+    goal_grid = read_grid(sys.argv[1])
+    directory = sys.argv[2] if len(sys.argv) >= 3 else "."
+    board = int(len(goal_grid) ** 0.5)
+    os.makedirs(directory, exist_ok=True)
+    costs, moves = build_oracle(goal_grid, board)
+    path = os.path.join(directory, oracle_file_name(goal_grid))
+    write_oracle(path, goal_grid, board, costs, moves)
+    reached = sum(1 for c in costs if c != UNREACHED)
+    print(f"Oracle: {reached} reachable states, max cost {max(c for c in costs if c != UNREACHED)}, written to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import time
+import heapq
+import queue
+import multiprocessing
+
+import expense_8_puzzle
+
+BATCH = 64
+
+def owner(key, workers):
+    # Fibonacci hashing of the packed board; neighbouring boards differ in a few low bits
+    # only, so the plain key modulo workers would spread them badly
+    return ((key * 0x9E3779B97F4A7C15) >> 40) % workers
+
+class Counters:
+    # Per-worker counters in shared memory. The coordinator reads them to detect termination
+    # and to enforce the node budget; each slot is only written by its own worker.
+    def __init__(self, workers):
+        self.sent = multiprocessing.RawArray('q', workers)
+        self.received = multiprocessing.RawArray('q', workers)
+        self.idle = multiprocessing.RawArray('b', workers)
+        self.expanded = multiprocessing.RawArray('q', workers)
+        self.generated = multiprocessing.RawArray('q', workers)
+        self.popped = multiprocessing.RawArray('q', workers)
+        self.max_open = multiprocessing.RawArray('q', workers)
+        # Cost of the best solution so far, shared by all workers
+        self.best = multiprocessing.RawValue('d', float("inf"))
+        self.lock = multiprocessing.Lock()
+
+    def snapshot(self):
+        return (tuple(self.sent), tuple(self.received), tuple(self.idle))
+
+def worker(index, workers, inboxes, replies, counters, start_grid, goal_grid, heuristic, pdb_dir):
+    # One HDA* worker. It owns every board with owner(key) == index: it keeps their open
+    # and closed entries, expands them and sends each successor to its owner in batches.
+    puzzle = expense_8_puzzle.Puzzle("start", "goal", "A*", False, heuristic, pdb_dir, start_grid=start_grid, goal_grid=goal_grid)
+    inbox = inboxes[index]
+    goal_key = puzzle.goal_key
+    heap = []
+    # closed[key] = (g, parent key, tile moved, move) of the cheapest expansion of key
+    closed = {}
+    best_g = {}
+    outgoing = [[] for _ in range(workers)]
+    counter = 0
+    sent = received = expanded = generated = popped = max_open = 0
+
+    def push(entry):
+        nonlocal counter
+        f, g, key = entry[0], entry[1], entry[2]
+        if g >= best_g.get(key, float("inf")):
+            return
+        best_g[key] = g
+        counter += 1
+        heapq.heappush(heap, (f, counter) + entry[1:])
+
+    def flush(target):
+        nonlocal sent
+        batch = outgoing[target]
+        if batch:
+            sent += len(batch)
+            counters.sent[index] = sent
+            inboxes[target].put(("nodes", batch))
+            outgoing[target] = []
+
+    if owner(puzzle.encode(start_grid), workers) == index:
+        start = puzzle.get_start_node()
+        push((start.algo, 0, start.state, start.blank, start.h, None, 0, None))
+
+    while True:
+        # Take in everything that has arrived without waiting
+        idle = not heap or heap[0][0] >= counters.best.value
+        try:
+            message = inbox.get(timeout=0.005) if idle else inbox.get_nowait()
+        except queue.Empty:
+            message = None
+        if message is not None:
+            kind = message[0]
+            if kind == "nodes":
+                counters.idle[index] = 0
+                for entry in message[1]:
+                    push(entry)
+                received += len(message[1])
+                counters.received[index] = received
+                continue
+            if kind == "trace":
+                replies.put(("trace", message[1], closed.get(message[1])))
+                continue
+            if kind == "stop":
+                break
+
+        # Expand a few nodes, then look at the inbox again
+        for _ in range(BATCH):
+            if not heap:
+                break
+            f, _, g, key, blank, h, parent, val, move = heapq.heappop(heap)
+            if best_g.get(key) != g:
+                continue
+            popped += 1
+            if f >= counters.best.value:
+                heap.clear()
+                break
+            closed[key] = (g, parent, val, move)
+            if key == goal_key:
+                with counters.lock:
+                    if g < counters.best.value:
+                        counters.best.value = g
+                continue
+            expanded += 1
+            node = expense_8_puzzle.Node(key, blank, val, move, 0, g, h, f, None)
+            for t, direction in puzzle.moves[blank]:
+                tile = (key >> (puzzle.bits * t)) & puzzle.mask
+                child_key = key + (tile << (puzzle.bits * blank)) - (tile << (puzzle.bits * t))
+                child = puzzle.get_temp_node(node, child_key, t, tile, direction)
+                generated += 1
+                if child.algo >= counters.best.value:
+                    continue
+                entry = (child.algo, child.cost, child_key, t, child.h, key, tile, direction)
+                target = owner(child_key, workers)
+                if target == index:
+                    push(entry)
+                else:
+                    outgoing[target].append(entry)
+                    if len(outgoing[target]) >= BATCH:
+                        flush(target)
+        # Send what this round produced, so a peer never waits on our buffer for nodes
+        # better than its own while we go on expanding
+        for target in range(workers):
+            flush(target)
+        max_open = max(max_open, len(heap))
+        counters.expanded[index] = expanded
+        counters.generated[index] = generated
+        counters.popped[index] = popped
+        counters.max_open[index] = max_open
+
+        if not heap or heap[0][0] >= counters.best.value:
+            # Nothing left that could beat the best solution; the buffers are already empty
+            counters.idle[index] = 1
+
+def terminated(counters, previous):
+    # Two consecutive identical snapshots with every worker idle and every sent node
+    # received mean no work is left anywhere, including in the queues
+    snapshot = counters.snapshot()
+    sent, received, idle = snapshot
+    done = all(idle) and sum(sent) == sum(received) and snapshot == previous
+    return done, snapshot
+
+def solve(puzzle, workers):
+    # Runs HDA* for puzzle and returns (path, status, counters). path lists
+    # (key, tile moved, move) from the start to the goal, or is None.
+    counters = Counters(workers)
+    inboxes = [multiprocessing.Queue() for _ in range(workers)]
+    replies = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(i, workers, inboxes, replies, counters, puzzle.start_grid,
+                                                             puzzle.goal_grid, puzzle.heuristic_name, puzzle.pdb_dir),
+                                         daemon=True)
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+
+    status = None
+    previous = None
+    try:
+        while True:
+            time.sleep(0.002)
+            done, previous = terminated(counters, previous)
+            if done:
+                break
+            if puzzle.node_limit is not None and sum(counters.expanded) >= puzzle.node_limit:
+                status = "node_limit"
+                break
+            if puzzle.deadline is not None and time.perf_counter() > puzzle.deadline:
+                status = "time_limit"
+                break
+
+        path = None
+        if status is None and counters.best.value != float("inf"):
+            # Walk the parent links back from the goal, asking each board's owner
+            path = []
+            key = puzzle.goal_key
+            while key is not None:
+                inboxes[owner(key, workers)].put(("trace", key))
+                _, _, entry = replies.get(timeout=30)
+                _, parent, val, move = entry
+                path.append((key, val, move))
+                key = parent
+            path.reverse()
+    finally:
+        for inbox in inboxes:
+            inbox.put(("stop",))
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    totals = {
+        "nodes_popped": sum(counters.popped),
+        "nodes_expanded": sum(counters.expanded),
+        "nodes_generated": sum(counters.generated) + 1,
+        "max_fringe_size": max(1, sum(counters.max_open)),
+        "per_worker_expanded": list(counters.expanded),
+    }
+    return path, status, totals
@@ -0,0 +1,146 @@
+import os
+import sys
+import mmap
+import heapq
+from array import array
+
+from boards import adjacent_cells, read_grid, write_atomic
+
+MAGIC = b"E8PDB1"
+UNREACHED = 0xFFFF
+
+def default_groups(size):
+    # Disjoint tile subsets for additive databases: 4 tiles per group up to the
+    # 15-puzzle, 3 per group on larger boards to keep each table to a few 100k entries
+    group = 4 if size <= 16 else 3
+    tiles = list(range(1, size))
+    return [tuple(tiles[i:i + group]) for i in range(0, len(tiles), group)]
+
+def pattern_rank(positions, size):
+    # Rank of an ordered selection of distinct cells, used as the table index
+    rank = 0
+    for i, pos in enumerate(positions):
+        smaller = 0
+        for j in range(i):
+            if positions[j] < pos:
+                smaller += 1
+        rank = rank * (size - i) + pos - smaller
+    return rank
+
+def table_size(size, length):
+    total = 1
+    for i in range(length):
+        total *= size - i
+    return total
+
+def build_pattern_db(goal_grid, board, tiles):
+    # Backward Dijkstra from the goal over abstract states (cells of the pattern tiles,
+    # then the blank). Moving a pattern tile costs its number, moving any other tile is
+    # free, so databases over disjoint groups can be added and stay admissible.
+    size = board * board
+    adjacent = adjacent_cells(board)
+    goal = tuple(goal_grid.index(t) for t in tiles) + (goal_grid.index(0),)
+    table = array('H', [UNREACHED]) * table_size(size, len(goal))
+    best = {goal: 0}
+    heap = [(0, goal)]
+    while heap:
+        cost, state = heapq.heappop(heap)
+        if best[state] < cost:
+            continue
+        table[pattern_rank(state, size)] = cost
+        blank = state[-1]
+        for cell in adjacent[blank]:
+            moved = list(state)
+            step = 0
+            for i in range(len(tiles)):
+                if state[i] == cell:
+                    moved[i] = blank
+                    step = tiles[i]
+                    break
+            moved[-1] = cell
+            moved = tuple(moved)
+            new_cost = cost + step
+            if new_cost < best.get(moved, UNREACHED):
+                best[moved] = new_cost
+                heapq.heappush(heap, (new_cost, moved))
+    return table
+
+def pdb_file_name(goal_grid, tiles):
+    width = "x" if len(goal_grid) <= 16 else "02x"
+    goal = "".join(format(t, width) for t in goal_grid)
+    group = "_".join(str(t) for t in tiles)
+    return f"pdb-{goal}-{group}.bin"
+
+def write_pattern_db(path, goal_grid, board, tiles, table):
+    header = MAGIC + bytes([board, len(tiles)]) + bytes(tiles) + bytes(goal_grid)
+    if len(header) % 2:
+        header += b"\0"
+    if sys.byteorder != "little":
+        table = array('H', table)
+        table.byteswap()
+    write_atomic(path, (header, table.tobytes()))
+
+class PatternDatabase:
+    # A single memory-mapped database file; values are little-endian uint16
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a pattern database file")
+        offset = len(MAGIC)
+        self.board = self.map[offset]
+        count = self.map[offset + 1]
+        offset += 2
+        self.tiles = tuple(self.map[offset:offset + count])
+        offset += count
+        self.size = self.board * self.board
+        self.goal_grid = list(self.map[offset:offset + self.size])
+        offset += self.size
+        offset += offset % 2
+        if sys.byteorder == "little":
+            self.values = memoryview(self.map)[offset:].cast('H')
+        else:
+            self.values = array('H', self.map[offset:])
+            self.values.byteswap()
+
+    def lookup(self, where):
+        # where[tile] is the cell holding that tile
+        positions = [where[t] for t in self.tiles]
+        positions.append(where[0])
+        return self.values[pattern_rank(positions, self.size)]
+
+    def close(self):
+        if isinstance(self.values, memoryview):
+            self.values.release()
+        self.map.close()
+        self.file.close()
+
+def load_pattern_dbs(goal_grid, board, directory = ".", groups = None):
+    # Memory-maps the databases for this goal, building and writing any that are missing
+    if groups is None:
+        groups = default_groups(board * board)
+    dbs = []
+    for tiles in groups:
+        path = os.path.join(directory, pdb_file_name(goal_grid, tiles))
+        if not os.path.exists(path):
+            write_pattern_db(path, goal_grid, board, tiles, build_pattern_db(goal_grid, board, tiles))
+        dbs.append(PatternDatabase(path))
+    return dbs
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 pattern_db.py <goal-file> [<output-dir>]")
+        return
+    goal_grid = read_grid(sys.argv[1])
+    directory = sys.argv[2] if len(sys.argv) >= 3 else "."
+    board = int(len(goal_grid) ** 0.5)
+    os.makedirs(directory, exist_ok=True)
+    for tiles in default_groups(len(goal_grid)):
+        table = build_pattern_db(goal_grid, board, tiles)
+        path = os.path.join(directory, pdb_file_name(goal_grid, tiles))
+        write_pattern_db(path, goal_grid, board, tiles, table)
+        print(f"Pattern {list(tiles)}: {len(table)} entries, max cost {max(v for v in table if v != UNREACHED)}, written to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import sys
+import json
+import socket
+import argparse
+
+from boards import read_grid
+
+class SolverClient:
+    # Blocking client for solver_service.py: one JSON request line out, one result line back
+    def __init__(self, socket_path = "expense_8_puzzle.sock", port = None, timeout = None):
+        if port is not None:
+            self.sock = socket.create_connection(("127.0.0.1", port), timeout)
+        else:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(socket_path)
+        self.stream = self.sock.makefile("rw", encoding="utf-8")
+
+    def request(self, message):
+        self.stream.write(json.dumps(message) + "\n")
+        self.stream.flush()
+        line = self.stream.readline()
+        if not line:
+            raise ConnectionError("solver service closed the connection")
+        return json.loads(line)
+
+    def solve(self, start, goal = None, method = None, **options):
+        message = {"start": list(start)}
+        if goal is not None:
+            message["goal"] = list(goal)
+        if method is not None:
+            message["method"] = method
+        message.update(options)
+        return self.request(message)
+
+    def stats(self):
+        return self.request({"op": "stats"})
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Send one puzzle to a running solver service.")
+    parser.add_argument("start_file", nargs="?", help="start board; leave out to print the service statistics")
+    parser.add_argument("goal_file", nargs="?", default=None, help="goal board (default: the service's goal)")
+    parser.add_argument("method", nargs="?", default=None)
+    parser.add_argument("--socket", default="expense_8_puzzle.sock")
+    parser.add_argument("--port", type=int, default=None)
+    args = parser.parse_args()
+
+    with SolverClient(args.socket, args.port) as client:
+        if args.start_file is None:
+            print(json.dumps(client.stats(), indent=1))
+            return
+        goal = read_grid(args.goal_file) if args.goal_file else None
+        result = client.solve(read_grid(args.start_file), goal, args.method)
+    print(json.dumps(result, indent=1))
+    if result["status"] == "error":
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
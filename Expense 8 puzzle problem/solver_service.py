@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import signal
+import asyncio
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from batch_solve import parse_jobs, rejected, solve_job
+from boards import read_grid
+from heuristics import heuristic_argument
+
+# Only final answers are cached; a stopped search depends on the budget it was given
+CACHEABLE = ("solved", "no_solution", "unsolvable")
+
+class SolutionCache:
+    # Bounded LRU map from (start, goal, method, heuristic, weight) to a result dictionary
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        if self.capacity <= 0:
+            return
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+def warm_worker(goal_grid, heuristic, pdb_dir):
+    # Loads the tables for the default goal once, when the worker process starts
+    if goal_grid:
+        solve_job({"id": "warm-up", "start": goal_grid, "goal": goal_grid, "method": "A*", "heuristic": heuristic,
+                   "weight": 1.0, "pdb_dir": pdb_dir, "oracle_dir": ".", "node_limit": None, "time_limit": None})
+
+class SolverService:
+    # Line-oriented JSON service. Each request line is a batch_solve job object, for example
+    #   {"start": [2, 3, 6, 1, 0, 7, 4, 8, 5], "method": "ucs"}
+    # and gets one result line back. {"op": "stats"} returns the cache statistics.
+    # Searches run on a pool of worker processes whose Puzzle tables stay loaded between
+    # requests; identical requests that arrive while one is being solved share its result.
+    def __init__(self, defaults, workers, cache_size):
+        self.defaults = defaults
+        self.cache = SolutionCache(cache_size)
+        self.pending = {}
+        self.requests = 0
+        self.solved = 0
+        self.pool = ProcessPoolExecutor(workers, initializer=warm_worker,
+                                        initargs=(defaults["goal"], defaults["heuristic"], defaults["pdb_dir"]))
+
+    async def handle_request(self, line):
+        self.requests += 1
+        try:
+            job = next(parse_jobs([line], self.defaults))
+        except (ValueError, AttributeError, StopIteration) as e:
+            return {"status": "error", "error": f"bad request: {e}"}
+        if job.get("status") == "error":
+            return job
+        if job.get("op") == "stats":
+            return {"status": "ok", "cache": self.cache.stats(), "requests": self.requests,
+                    "searches": self.solved, "in_flight": len(self.pending)}
+        if not job.get("start") or not job.get("goal"):
+            return {"id": job["id"], "status": "error", "error": "start and goal boards are required"}
+
+        key = (tuple(job["start"]), tuple(job["goal"]), job["method"], job["heuristic"], job["weight"])
+        result = self.cache.get(key)
+        if result is not None:
+            return dict(result, id=job["id"], cached=True)
+        future = self.pending.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self.search(job))
+            self.pending[key] = future
+            future.add_done_callback(lambda _: self.pending.pop(key, None))
+        result = await asyncio.shield(future)
+        if result["status"] in CACHEABLE:
+            self.cache.put(key, result)
+        return dict(result, id=job["id"], cached=False)
+
+    async def search(self, job):
+        result = rejected(job)
+        if result is None:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.pool, solve_job, job)
+            self.solved += 1
+        result = dict(result)
+        result.pop("id", None)
+        return result
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = await self.handle_request(line.decode())
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+        except ConnectionResetError:
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+async def serve(service, socket_path, port):
+    if port is not None:
+        server = await asyncio.start_server(service.handle_connection, "127.0.0.1", port)
+        where = f"127.0.0.1:{port}"
+    else:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = await asyncio.start_unix_server(service.handle_connection, socket_path)
+        where = socket_path
+    print(f"Solver service listening on {where}", file=sys.stderr, flush=True)
+    # SIGINT or SIGTERM stops the service cleanly, so the socket file and workers are removed
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(number, stopped.set)
+    async with server:
+        await stopped.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-running solver service with warm tables and an LRU solution cache.")
+    parser.add_argument("--socket", default="expense_8_puzzle.sock", help="Unix socket path (default expense_8_puzzle.sock)")
+    parser.add_argument("--port", type=int, default=None, help="listen on 127.0.0.1:PORT instead of a Unix socket")
+    parser.add_argument("--goal-file", default=None, help="goal used by requests that do not give their own")
+    parser.add_argument("--method", default="A*", help="method used by requests that do not give their own")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--cache-size", type=int, default=10000, help="solutions kept in the LRU cache")
+    parser.add_argument("--node-limit", type=int, default=None, help="default per-request limit on expanded nodes")
+    parser.add_argument("--time-limit", type=float, default=None, help="default per-request limit in seconds")
+    parser.add_argument("--heuristic", type=heuristic_argument, default="manhattan")
+    parser.add_argument("--weight", type=float, default=2.0, help="default heuristic weight of wa* and awa* requests")
+    parser.add_argument("--pdb-dir", default=".")
+    parser.add_argument("--oracle-dir", default=".")
+    args = parser.parse_args()
+
+    defaults = {
+        "goal": read_grid(args.goal_file) if args.goal_file else None,
+        "method": args.method,
+        "node_limit": args.node_limit,
+        "time_limit": args.time_limit,
+        "heuristic": args.heuristic,
+        "weight": args.weight,
+        "pdb_dir": args.pdb_dir,
+        "oracle_dir": args.oracle_dir,
+    }
+    service = SolverService(defaults, args.workers, args.cache_size)
+    try:
+        asyncio.run(serve(service, args.socket, args.port))
+    finally:
+        service.close()
+        if args.port is None and os.path.exists(args.socket):
+            os.unlink(args.socket)
+        print(f"Cache: {service.cache.stats()}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
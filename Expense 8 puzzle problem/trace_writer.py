@@ -0,0 +1,52 @@
+import gzip
+import queue
+import threading
+
+LEVELS = ("summary", "delta", "full")
+
+class TraceWriter:
+    # File-like writer for search traces. write() only appends to an in-memory buffer;
+    # full buffers are handed to a background thread that does the (optionally gzip'd)
+    # file I/O, so the search loop never waits on the disk.
+    def __init__(self, filename, compress = False, buffer_size = 1 << 16):
+        if compress:
+            self.file = gzip.open(filename, "wt", compresslevel=3)
+        else:
+            self.file = open(filename, "w", buffering=1 << 20)
+        self.filename = filename
+        self.buffer_size = buffer_size
+        self.parts = []
+        self.size = 0
+        # Bounded so a search that outruns the disk blocks instead of growing without limit
+        self.chunks = queue.Queue(maxsize=64)
+        self.thread = threading.Thread(target=self.__drain, name="trace-writer", daemon=True)
+        self.thread.start()
+        self.closed = False
+
+    def __drain(self):
+        while True:
+            chunk = self.chunks.get()
+            if chunk is None:
+                break
+            self.file.write(chunk)
+        self.file.close()
+
+    def write(self, data):
+        self.parts.append(data)
+        self.size += len(data)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.parts:
+            self.chunks.put("".join(self.parts))
+            self.parts = []
+            self.size = 0
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.flush()
+        self.chunks.put(None)
+        self.thread.join()